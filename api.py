@@ -1,17 +1,24 @@
 import asyncio
 import json
 import logging
+import random
+import time
 from collections.abc import AsyncIterator
 from typing import Any
 
 import aiohttp
 from tenacity import before_sleep_log, retry, retry_if_exception_type, wait_fixed
 
-from botli_dataclasses import API_Challenge_Reponse, Challenge_Request
+from botli_dataclasses import API_Challenge_Reponse, Challenge_Request, Connection_Pool_Stats, Move_Submission
 from config import Config
-from enums import Decline_Reason, Variant
+from enums import Decline_Reason, Request_Type, Variant
+from rate_limiter import Rate_Limiter
+from response_cache import Response_Cache
 
 logger = logging.getLogger(__name__)
+EXTERNAL_HOSTS = {'chessdb': 'http://www.chessdb.cn',
+                  'explorer': 'https://explorer.lichess.ovh',
+                  'tablebase': 'https://tablebase.lichess.ovh'}
 BASIC_RETRY_CONDITIONS = {'retry': retry_if_exception_type((aiohttp.ClientError, TimeoutError)),
                           'wait': wait_fixed(5.0),
                           'before_sleep': before_sleep_log(logger, logging.DEBUG)}
@@ -23,17 +30,24 @@ GAME_STREAM_RETRY_CONDITIONS = {'retry': retry_if_exception_type((aiohttp.Client
                                                                   TimeoutError)),
                                 'wait': wait_fixed(1.0),
                                 'before_sleep': before_sleep_log(logger, logging.DEBUG)}
-MOVE_RETRY_CONDITIONS = {'retry': retry_if_exception_type((aiohttp.ClientError, TimeoutError)),
-                         'wait': wait_fixed(1.0),
-                         'before_sleep': before_sleep_log(logger, logging.DEBUG)}
 
 
 class API:
     def __init__(self, config: Config) -> None:
-        self.lichess_session = aiohttp.ClientSession(config.url, headers={'Authorization': f'Bearer {config.token}',
-                                                                          'User-Agent': f'BotLi/{config.version}'},
-                                                     timeout=aiohttp.ClientTimeout(total=5.0))
-        self.external_session = aiohttp.ClientSession(headers={'User-Agent': f'BotLi/{config.version}'})
+        self.rate_limiter = Rate_Limiter()
+        self.pool_stats: dict[str, Connection_Pool_Stats] = {}
+        lichess_headers = {'Authorization': f'Bearer {config.token}', 'User-Agent': f'BotLi/{config.version}'}
+        self.lichess_session = self._create_session('lichess', config.url, lichess_headers,
+                                                    aiohttp.TCPConnector(limit=16, ttl_dns_cache=300))
+        self.stream_session = self._create_session('stream', config.url, lichess_headers,
+                                                   aiohttp.TCPConnector(limit=0, ttl_dns_cache=300))
+        self.move_session = self._create_session('move', config.url, lichess_headers,
+                                                 aiohttp.TCPConnector(limit=0, ttl_dns_cache=300,
+                                                                      keepalive_timeout=60.0))
+        self.external_sessions = {name: self._create_session(name, url, {'User-Agent': f'BotLi/{config.version}'},
+                                                             aiohttp.TCPConnector(limit=8, ttl_dns_cache=300))
+                                  for name, url in EXTERNAL_HOSTS.items()}
+        self.response_cache = Response_Cache(config.online_moves.cache)
 
     async def __aenter__(self) -> 'API':
         return self
@@ -42,17 +56,19 @@ class API:
         await self.close()
 
     def append_user_agent(self, username: str) -> None:
-        self.lichess_session.headers['User-Agent'] += f' user:{username}'
-        self.external_session.headers['User-Agent'] += f' user:{username}'
+        for session in self._get_sessions():
+            session.headers['User-Agent'] += f' user:{username}'
 
     async def close(self) -> None:
-        await self.lichess_session.close()
-        await self.external_session.close()
+        for session in self._get_sessions():
+            await session.close()
+        self.response_cache.close()
 
     @retry(**BASIC_RETRY_CONDITIONS)
     async def abort_game(self, game_id: str) -> bool:
         try:
-            async with self.lichess_session.post(f'/api/bot/game/{game_id}/abort') as response:
+            async with (self.rate_limiter.critical(),
+                        self.move_session.post(f'/api/bot/game/{game_id}/abort') as response):
                 response.raise_for_status()
                 return True
         except aiohttp.ClientResponseError as e:
@@ -61,6 +77,7 @@ class API:
 
     @retry(**BASIC_RETRY_CONDITIONS)
     async def accept_challenge(self, challenge_id: str) -> bool:
+        await self.rate_limiter.acquire(Request_Type.CHALLENGE)
         try:
             async with self.lichess_session.post(f'/api/challenge/{challenge_id}/accept') as response:
                 response.raise_for_status()
@@ -72,6 +89,7 @@ class API:
 
     @retry(**BASIC_RETRY_CONDITIONS)
     async def cancel_challenge(self, challenge_id: str) -> bool:
+        await self.rate_limiter.acquire(Request_Type.CHALLENGE)
         try:
             async with self.lichess_session.post(f'/api/challenge/{challenge_id}/cancel') as response:
                 response.raise_for_status()
@@ -83,7 +101,8 @@ class API:
     @retry(**BASIC_RETRY_CONDITIONS)
     async def claim_victory(self, game_id: str) -> bool:
         try:
-            async with self.lichess_session.post(f'/api/bot/game/{game_id}/claim-victory') as response:
+            async with (self.rate_limiter.critical(),
+                        self.move_session.post(f'/api/bot/game/{game_id}/claim-victory') as response):
                 response.raise_for_status()
                 return True
         except aiohttp.ClientResponseError as e:
@@ -93,16 +112,17 @@ class API:
     async def create_challenge(self,
                                challenge_request: Challenge_Request
                                ) -> AsyncIterator[API_Challenge_Reponse]:
+        await self.rate_limiter.acquire(Request_Type.CHALLENGE)
         try:
-            async with self.lichess_session.post(f'/api/challenge/{challenge_request.opponent_username}',
-                                                 data={'rated': 'true' if challenge_request.rated else 'false',
-                                                       'clock.limit': challenge_request.initial_time,
-                                                       'clock.increment': challenge_request.increment,
-                                                       'color': challenge_request.color,
-                                                       'variant': challenge_request.variant,
-                                                       'keepAliveStream': 'true'},
-                                                 timeout=aiohttp.ClientTimeout(total=challenge_request.timeout)
-                                                 ) as response:
+            async with self.stream_session.post(f'/api/challenge/{challenge_request.opponent_username}',
+                                                data={'rated': 'true' if challenge_request.rated else 'false',
+                                                      'clock.limit': challenge_request.initial_time,
+                                                      'clock.increment': challenge_request.increment,
+                                                      'color': challenge_request.color,
+                                                      'variant': challenge_request.variant,
+                                                      'keepAliveStream': 'true'},
+                                                timeout=aiohttp.ClientTimeout(total=challenge_request.timeout)
+                                                ) as response:
 
                 if response.status == 429:
                     yield API_Challenge_Reponse(has_reached_rate_limit=True)
@@ -127,6 +147,7 @@ class API:
 
     @retry(**BASIC_RETRY_CONDITIONS)
     async def decline_challenge(self, challenge_id: str, reason: Decline_Reason) -> bool:
+        await self.rate_limiter.acquire(Request_Type.CHALLENGE)
         try:
             async with self.lichess_session.post(f'/api/challenge/{challenge_id}/decline',
                                                  data={'reason': reason}) as response:
@@ -138,6 +159,7 @@ class API:
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def get_account(self) -> dict[str, Any]:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         async with self.lichess_session.get('/api/account') as response:
             json_response = await response.json()
 
@@ -147,38 +169,69 @@ class API:
             return json_response
 
     async def get_chessdb_eval(self, fen: str, timeout: int) -> dict[str, Any] | None:
+        cache_key = self._get_position_key(fen)
+        if cached_response := self.response_cache.get('chessdb', cache_key):
+            return cached_response
+
         try:
-            async with self.external_session.get('http://www.chessdb.cn/cdb.php',
-                                                 params={'action': 'queryall',
-                                                         'board': fen,
-                                                         'json': 1},
-                                                 timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            async with self.external_sessions['chessdb'].get('/cdb.php',
+                                                             params={'action': 'queryall',
+                                                                     'board': fen,
+                                                                     'json': 1},
+                                                             timeout=aiohttp.ClientTimeout(total=timeout)) as response:
                 response.raise_for_status()
-                return await response.json()
+                json_response = await response.json()
+                self.response_cache.set('chessdb', cache_key, json_response, json_response.get('status') == 'ok')
+                return json_response
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             print(f'ChessDB: {e}')
         except TimeoutError:
             print(f'ChessDB: Timed out after {timeout} second(s).')
 
     async def get_cloud_eval(self, fen: str, variant: Variant, timeout: int) -> dict[str, Any] | None:
+        cache_key = f'{variant} {self._get_position_key(fen)}'
+        if cached_response := self.response_cache.get('cloud', cache_key):
+            return cached_response
+
+        if not await self.rate_limiter.try_acquire(Request_Type.CLOUD, min(timeout, 1.0)):
+            print('Cloud: Skipped because of rate limiting.')
+            return {'skipped': True}
+
         try:
             async with self.lichess_session.get('/api/cloud-eval', params={'fen': fen, 'variant': variant},
                                                 timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+                if response.status == 429:
+                    return {'skipped': True}
+
+                if response.status == 404:
+                    json_response = {'error': 'Not found'}
+                    self.response_cache.set('cloud', cache_key, json_response, False)
+                    return json_response
+
                 response.raise_for_status()
-                return await response.json()
+                json_response = await response.json()
+                self.response_cache.set('cloud', cache_key, json_response, 'error' not in json_response)
+                return json_response
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             print(f'Cloud: {e}')
         except TimeoutError:
             print(f'Cloud: Timed out after {timeout} second(s).')
 
     async def get_egtb(self, fen: str, variant: str, timeout: int) -> dict[str, Any] | None:
+        cache_key = f'{variant} {fen}'
+        if cached_response := self.response_cache.get('egtb', cache_key):
+            return cached_response
+
         try:
-            async with self.external_session.get(f'https://tablebase.lichess.ovh/{variant}',
-                                                 params={'fen': fen},
-                                                 timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            async with self.external_sessions['tablebase'].get(f'/{variant}',
+                                                               params={'fen': fen},
+                                                               timeout=aiohttp.ClientTimeout(total=timeout)
+                                                               ) as response:
 
                 response.raise_for_status()
-                return await response.json()
+                json_response = await response.json()
+                self.response_cache.set('egtb', cache_key, json_response, json_response['category'] != 'unknown')
+                return json_response
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             print(f'EGTB: {e}')
         except TimeoutError:
@@ -186,24 +239,25 @@ class API:
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def get_event_stream(self, queue: asyncio.Queue[dict[str, Any]]) -> None:
-        async with self.lichess_session.get('/api/stream/event',
-                                            timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
+        async with self.stream_session.get('/api/stream/event',
+                                           timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
             async for line in response.content:
                 if line.strip():
                     await queue.put(json.loads(line))
 
     @retry(**GAME_STREAM_RETRY_CONDITIONS)
     async def get_game_stream(self, game_id: str, queue: asyncio.Queue[dict[str, Any]]) -> None:
-        async with self.lichess_session.get(f'/api/bot/game/stream/{game_id}',
-                                            timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
+        async with self.stream_session.get(f'/api/bot/game/stream/{game_id}',
+                                           timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
             async for line in response.content:
                 if line.strip():
                     await queue.put(json.loads(line))
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def get_online_bots(self) -> list[dict[str, Any]]:
-        async with self.lichess_session.get('/api/bot/online',
-                                            timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
+        await self.rate_limiter.acquire(Request_Type.STATUS)
+        async with self.stream_session.get('/api/bot/online',
+                                           timeout=aiohttp.ClientTimeout(sock_read=9.0)) as response:
             return [json.loads(line) async for line in response.content if line.strip()]
 
     async def get_opening_explorer(self,
@@ -220,14 +274,21 @@ class API:
             params['speeds'] = speeds
         if modes:
             params['modes'] = modes
+
+        cache_key = f'{username} {variant} {color} {modes} {speeds} {self._get_position_key(fen)}'
+        if cached_response := self.response_cache.get('explorer', cache_key):
+            return cached_response
+
         try:
-            async with self.external_session.get('https://explorer.lichess.ovh/player',
-                                                 params=params,
-                                                 timeout=aiohttp.ClientTimeout(total=timeout)) as response:
+            async with self.external_sessions['explorer'].get('/player',
+                                                              params=params,
+                                                              timeout=aiohttp.ClientTimeout(total=timeout)) as response:
                 response.raise_for_status()
                 async for line in response.content:
                     if line.strip():
-                        return json.loads(line)
+                        json_response = json.loads(line)
+                        self.response_cache.set('explorer', cache_key, json_response, bool(json_response['moves']))
+                        return json_response
         except (aiohttp.ClientError, json.JSONDecodeError) as e:
             print(f'Explore: {e}')
         except TimeoutError:
@@ -235,23 +296,26 @@ class API:
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def get_token_scopes(self, token: str) -> str:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         async with self.lichess_session.post('/api/token/test', data=token) as response:
             json_response = await response.json()
             return json_response[token]['scopes']
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def get_tournament_info(self, tournament_id: str) -> dict[str, Any]:
+        await self.rate_limiter.acquire(Request_Type.STATUS)
         async with self.lichess_session.get(f'/api/tournament/{tournament_id}') as response:
             return await response.json()
 
     @retry(**JSON_RETRY_CONDITIONS)
-    async def get_user_status(self, username: str) -> dict[str, Any]:
-        async with self.lichess_session.get('/api/users/status', params={'ids': username}) as response:
-            json_response = await response.json()
-            return json_response[0]
+    async def get_users_status(self, usernames: list[str]) -> list[dict[str, Any]]:
+        await self.rate_limiter.acquire(Request_Type.STATUS)
+        async with self.lichess_session.get('/api/users/status', params={'ids': ','.join(usernames)}) as response:
+            return await response.json()
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def join_team(self, team: str, password: str | None) -> bool:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         data = {'password': password} if password else None
         async with self.lichess_session.post(f'/team/{team.lower()}/join', data=data) as response:
             json_response = await response.json()
@@ -262,6 +326,7 @@ class API:
 
     @retry(**JSON_RETRY_CONDITIONS)
     async def join_tournament(self, tournament_id: str, team: str | None, password: str | None) -> bool:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         data: dict[str, str] = {}
         if team:
             data['team'] = team.lower()
@@ -274,17 +339,11 @@ class API:
                 return False
             return True
 
-    @retry(**BASIC_RETRY_CONDITIONS)
-    async def resign_game(self, game_id: str) -> bool:
-        try:
-            async with self.lichess_session.post(f'/api/bot/game/{game_id}/resign') as response:
-                response.raise_for_status()
-                return True
-        except aiohttp.ClientResponseError as e:
-            print(e)
-            return False
+    async def resign_game(self, game_id: str, deadline: float) -> Move_Submission:
+        return await self._send_move_request(f'/api/bot/game/{game_id}/resign', {}, deadline)
 
     async def send_chat_message(self, game_id: str, room: str, text: str) -> bool:
+        await self.rate_limiter.acquire(Request_Type.CHAT)
         try:
             async with self.lichess_session.post(f'/api/bot/game/{game_id}/chat',
                                                  data={'room': room, 'text': text},
@@ -294,23 +353,14 @@ class API:
         except (aiohttp.ClientError, TimeoutError):
             return False
 
-    @retry(**MOVE_RETRY_CONDITIONS)
-    async def send_move(self, game_id: str, uci_move: str, offer_draw: bool) -> bool:
-        try:
-            async with self.lichess_session.post(f'/api/bot/game/{game_id}/move/{uci_move}',
-                                                 params={'offeringDraw': 'true' if offer_draw else 'false'},
-                                                 timeout=aiohttp.ClientTimeout(total=1.0)) as response:
-                response.raise_for_status()
-                return True
-        except aiohttp.ClientResponseError as e:
-            if 500 <= e.status <= 599:
-                raise
-            if e.status != 400:
-                print(e)
-            return False
+    async def send_move(self, game_id: str, uci_move: str, offer_draw: bool, deadline: float) -> Move_Submission:
+        return await self._send_move_request(f'/api/bot/game/{game_id}/move/{uci_move}',
+                                             {'offeringDraw': 'true' if offer_draw else 'false'},
+                                             deadline)
 
     @retry(**BASIC_RETRY_CONDITIONS)
     async def upgrade_account(self) -> bool:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         try:
             async with self.lichess_session.post('/api/bot/account/upgrade') as response:
                 response.raise_for_status()
@@ -319,8 +369,88 @@ class API:
             print(e)
             return False
 
+    async def _send_move_request(self, path: str, params: dict[str, str], deadline: float) -> Move_Submission:
+        start_time = time.perf_counter()
+        attempts = 0
+        while True:
+            attempts += 1
+            timeout = min(max(deadline - time.perf_counter(), 0.2), 1.0)
+            try:
+                async with (self.rate_limiter.critical(),
+                            self.move_session.post(path, params=params,
+                                                   timeout=aiohttp.ClientTimeout(total=timeout)) as response):
+                    response.raise_for_status()
+                    return Move_Submission(True, attempts, time.perf_counter() - start_time)
+            except aiohttp.ClientResponseError as e:
+                if not 500 <= e.status <= 599:
+                    if e.status != 400:
+                        print(e)
+                    return Move_Submission(False, attempts, time.perf_counter() - start_time)
+            except (aiohttp.ClientError, TimeoutError):
+                pass
+
+            delay = random.uniform(0.0, min(0.05 * 2 ** attempts, 0.5))
+            if time.perf_counter() + delay >= deadline:
+                return Move_Submission(False, attempts, time.perf_counter() - start_time)
+
+            await asyncio.sleep(delay)
+
+    async def _rate_limit_middleware(self,
+                                     request: aiohttp.ClientRequest,
+                                     handler: aiohttp.ClientHandlerType
+                                     ) -> aiohttp.ClientResponse:
+        response = await handler(request)
+        if response.status == 429:
+            match request.url.path.strip('/').split('/'):
+                case ['api', 'cloud-eval']:
+                    self.rate_limiter.start_cooldown(Request_Type.CLOUD)
+                case ['api', 'challenge', _]:
+                    pass  # create_challenge reports its own rate limit
+                case _:
+                    self.rate_limiter.start_cooldown()
+
+        return response
+
+    async def warm_up_move_connection(self) -> None:
+        try:
+            async with self.move_session.head('/', timeout=aiohttp.ClientTimeout(total=5.0)):
+                pass
+        except (aiohttp.ClientError, TimeoutError):
+            pass
+
+    def _create_session(self,
+                        pool_name: str,
+                        base_url: str,
+                        headers: dict[str, str],
+                        connector: aiohttp.TCPConnector
+                        ) -> aiohttp.ClientSession:
+        self.pool_stats[pool_name] = Connection_Pool_Stats(connector.limit)
+
+        async def count_requests(request: aiohttp.ClientRequest,
+                                 handler: aiohttp.ClientHandlerType) -> aiohttp.ClientResponse:
+            pool_stats = self.pool_stats[pool_name]
+            pool_stats.requests += 1
+            pool_stats.in_flight += 1
+            pool_stats.peak_in_flight = max(pool_stats.peak_in_flight, pool_stats.in_flight)
+            try:
+                return await handler(request)
+            finally:
+                pool_stats.in_flight -= 1
+
+        middlewares = (count_requests,) if pool_name in EXTERNAL_HOSTS else (count_requests,
+                                                                             self._rate_limit_middleware)
+        return aiohttp.ClientSession(base_url, headers=headers, connector=connector,
+                                     timeout=aiohttp.ClientTimeout(total=5.0), middlewares=middlewares)
+
+    def _get_sessions(self) -> list[aiohttp.ClientSession]:
+        return [self.lichess_session, self.stream_session, self.move_session, *self.external_sessions.values()]
+
+    def _get_position_key(self, fen: str) -> str:
+        return ' '.join(fen.split()[:4])
+
     @retry(**BASIC_RETRY_CONDITIONS)
     async def withdraw_tournament(self, tournament_id: str) -> bool:
+        await self.rate_limiter.acquire(Request_Type.ACCOUNT)
         try:
             async with self.lichess_session.post(f'/api/tournament/{tournament_id}/withdraw') as response:
                 response.raise_for_status()
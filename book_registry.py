@@ -0,0 +1,49 @@
+import mmap
+
+import chess
+import chess.polyglot
+from chess.polyglot import MemoryMappedReader
+
+from configs import Books_Config, Opening_Books_Config
+
+
+class Book_Registry:
+    def __init__(self, opening_books_config: Opening_Books_Config) -> None:
+        self.opening_books_config = opening_books_config
+        self.readers: dict[str, MemoryMappedReader] = {}
+
+    def start(self) -> None:
+        if not self.opening_books_config.enabled:
+            return
+
+        for books_config in self.opening_books_config.books.values():
+            for path in books_config.names.values():
+                reader = self._get_reader(path)
+
+                if self.opening_books_config.preload:
+                    self._warm(reader)
+
+        mapped_size = sum(reader.mmap.size() for reader in self.readers.values())
+        print(f'{len(self.readers)} opening book(s) opened with {mapped_size / 1024**2:.1f} MiB mapped.')
+
+    def get_readers(self, books_config: Books_Config) -> dict[str, MemoryMappedReader]:
+        return {name: self._get_reader(path) for name, path in books_config.names.items()}
+
+    def close(self) -> None:
+        for reader in self.readers.values():
+            reader.close()
+
+        self.readers.clear()
+
+    def _get_reader(self, path: str) -> MemoryMappedReader:
+        if path not in self.readers:
+            self.readers[path] = chess.polyglot.open_reader(path)
+
+        return self.readers[path]
+
+    def _warm(self, reader: MemoryMappedReader) -> None:
+        if isinstance(reader.mmap, mmap.mmap) and hasattr(mmap, 'MADV_WILLNEED'):
+            reader.mmap.madvise(mmap.MADV_WILLNEED)
+
+        for _ in reader.find_all(chess.Board()):
+            pass
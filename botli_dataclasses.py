@@ -1,4 +1,5 @@
 from asyncio import Task
+from collections.abc import Callable
 from dataclasses import dataclass, field
 from datetime import UTC, datetime, timedelta
 from typing import Any, Literal
@@ -94,6 +95,14 @@ class Chat_Message:
         return cls(username, text, room)
 
 
+@dataclass
+class Connection_Pool_Stats:
+    limit: int
+    requests: int = 0
+    in_flight: int = 0
+    peak_in_flight: int = 0
+
+
 @dataclass(frozen=True)
 class Game_Information:
     id_: str
@@ -217,7 +226,7 @@ class Lichess_Move:
     resign: bool
 
 
-@dataclass
+@dataclass(slots=True)
 class Matchmaking_Data:
     release_time: datetime = datetime.now()
     multiplier: int = 1
@@ -245,6 +254,14 @@ class Matchmaking_Data:
         return dict_
 
 
+@dataclass
+class Matchmaking_Game:
+    opponent_username: str
+    color: Challenge_Color
+    matchmaking_type: 'Matchmaking_Type'
+    start_time: datetime
+
+
 @dataclass
 class Matchmaking_Type:
     name: str
@@ -291,7 +308,7 @@ class Matchmaking_Type:
 @dataclass
 class Move_Response:
     move: chess.Move
-    public_message: str
+    format_message: Callable[[chess.Board], str]
     private_message: str = field(default='', kw_only=True)
     pv: list[chess.Move] = field(default_factory=list, kw_only=True)
     is_drawish: bool = field(default=False, kw_only=True)
@@ -299,6 +316,13 @@ class Move_Response:
     is_engine_move: bool = field(default=False, kw_only=True)
 
 
+@dataclass
+class Move_Submission:
+    was_sent: bool
+    attempts: int
+    latency: float
+
+
 @dataclass
 class Syzygy_Result:
     move: chess.Move
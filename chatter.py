@@ -1,6 +1,8 @@
+import asyncio
 import os
 import platform
-from collections import defaultdict
+import time
+from collections import defaultdict, deque
 
 import psutil
 
@@ -9,6 +11,11 @@ from botli_dataclasses import Chat_Message, Game_Information
 from config import Config
 from lichess_game import Lichess_Game
 
+OUTBOX_SIZE = 16
+MESSAGE_INTERVAL = 1.0
+DRAIN_TIMEOUT = 10.0
+DRAIN_TASKS: set[asyncio.Task[None]] = set()
+
 
 class Chatter:
     def __init__(self,
@@ -31,8 +38,13 @@ class Chatter:
         self.spectator_greeting = self._format_message(config.messages.greeting_spectators)
         self.spectator_goodbye = self._format_message(config.messages.goodbye_spectators)
         self.print_eval_rooms: set[str] = set()
+        self.outbox: deque[tuple[str, str | None]] = deque()
+        self.outbox_event = asyncio.Event()
+        self.is_closing = False
+        self.last_message_time = 0.0
+        self.outbox_task = asyncio.create_task(self._outbox_task())
 
-    async def handle_chat_message(self, chatLine_Event: dict) -> None:
+    def handle_chat_message(self, chatLine_Event: dict) -> None:
         chat_message = Chat_Message.from_chatLine_event(chatLine_Event)
 
         if chat_message.username == 'lichess':
@@ -49,62 +61,76 @@ class Chatter:
             print(output)
 
         if chat_message.text.startswith('!'):
-            await self._handle_command(chat_message)
+            self._handle_command(chat_message)
 
-    async def print_eval(self) -> None:
+    def print_eval(self) -> None:
         if not self.game_info.increment_ms and self.lichess_game.own_time < 30.0:
             return
 
         for room in self.print_eval_rooms:
-            await self._send_last_message(room)
+            self._send_message(room, None)
 
-    async def send_greetings(self) -> None:
+    def send_greetings(self) -> None:
         if self.player_greeting:
-            await self.api.send_chat_message(self.game_info.id_, 'player', self.player_greeting)
+            self._send_message('player', self.player_greeting)
 
         if self.spectator_greeting:
-            await self.api.send_chat_message(self.game_info.id_, 'spectator', self.spectator_greeting)
+            self._send_message('spectator', self.spectator_greeting)
+
+    def send_goodbyes(self) -> None:
+        self.outbox = deque((room, text) for room, text in self.outbox if text is not None)
 
-    async def send_goodbyes(self) -> None:
         if self.lichess_game.is_abortable:
             return
 
         if self.player_goodbye:
-            await self.api.send_chat_message(self.game_info.id_, 'player', self.player_goodbye)
+            self._send_message('player', self.player_goodbye)
 
         if self.spectator_goodbye:
-            await self.api.send_chat_message(self.game_info.id_, 'spectator', self.spectator_goodbye)
+            self._send_message('spectator', self.spectator_goodbye)
+
+    def send_abortion_message(self) -> None:
+        self._send_message('player', ('Too bad you weren\'t there. '
+                                      'Feel free to challenge me again, '
+                                      'I will accept the challenge if possible.'))
+
+    def close(self) -> None:
+        self.is_closing = True
+        self.outbox_event.set()
 
-    async def send_abortion_message(self) -> None:
-        await self.api.send_chat_message(self.game_info.id_, 'player', ('Too bad you weren\'t there. '
-                                                                        'Feel free to challenge me again, '
-                                                                        'I will accept the challenge if possible.'))
+        drain_task = asyncio.create_task(self._drain_outbox())
+        DRAIN_TASKS.add(drain_task)
+        drain_task.add_done_callback(DRAIN_TASKS.discard)
 
-    async def _handle_command(self, chat_message: Chat_Message) -> None:
+    async def _drain_outbox(self) -> None:
+        try:
+            await asyncio.wait_for(self.outbox_task, DRAIN_TIMEOUT)
+        except TimeoutError:
+            print('Pending chat messages could not be sent before the end of the game.')
+
+    def _handle_command(self, chat_message: Chat_Message) -> None:
         match chat_message.text[1:].lower():
             case 'cpu':
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, self.cpu_message)
+                self._send_message(chat_message.room, self.cpu_message)
             case 'draw':
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, self.draw_message)
+                self._send_message(chat_message.room, self.draw_message)
             case 'eval':
-                await self._send_last_message(chat_message.room)
+                self._send_message(chat_message.room, None)
             case 'motor':
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, self.lichess_game.engine.name)
+                self._send_message(chat_message.room, self.lichess_game.engine.name)
             case 'name':
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, self.name_message)
+                self._send_message(chat_message.room, self.name_message)
             case 'printeval':
                 if not self.game_info.increment_ms and self.game_info.initial_time_ms < 180_000:
-                    await self._send_last_message(chat_message.room)
+                    self._send_message(chat_message.room, None)
                     return
 
                 if chat_message.room in self.print_eval_rooms:
                     return
 
                 self.print_eval_rooms.add(chat_message.room)
-                await self.api.send_chat_message(self.game_info.id_,
-                                                 chat_message.room,
-                                                 'Type !quiet to stop eval printing.')
-                await self._send_last_message(chat_message.room)
+                self._send_message(chat_message.room, 'Type !quiet to stop eval printing.')
+                self._send_message(chat_message.room, None)
             case 'quiet':
                 self.print_eval_rooms.discard(chat_message.room)
             case 'pv':
@@ -114,25 +140,56 @@ class Chatter:
                 if not (message := self._append_pv()):
                     message = 'No PV available.'
 
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, message)
+                self._send_message(chat_message.room, message)
             case 'ram':
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, self.ram_message)
+                self._send_message(chat_message.room, self.ram_message)
             case 'help' | 'commands':
                 if chat_message.room == 'player':
                     message = 'Supported commands: !cpu, !draw, !eval, !motor, !name, !printeval, !ram'
                 else:
                     message = 'Supported commands: !cpu, !draw, !eval, !motor, !name, !printeval, !pv, !ram'
 
-                await self.api.send_chat_message(self.game_info.id_, chat_message.room, message)
+                self._send_message(chat_message.room, message)
+
+    def _send_message(self, room: str, text: str | None) -> None:
+        if text is None and (room, None) in self.outbox:
+            return
+
+        if len(self.outbox) >= OUTBOX_SIZE:
+            print(f'Chat message to {room} dropped because the outbox is full.')
+            return
+
+        self.outbox.append((room, text))
+        self.outbox_event.set()
+
+    async def _outbox_task(self) -> None:
+        while True:
+            await self.outbox_event.wait()
+            self.outbox_event.clear()
+
+            while self.outbox:
+                await asyncio.sleep(self.last_message_time + MESSAGE_INTERVAL - time.monotonic())
+                if not self.outbox:
+                    break
+
+                room, text = self.outbox.popleft()
+                if text is None:
+                    text = self._get_last_message(room)
+
+                await self.api.send_chat_message(self.game_info.id_, room, text)
+                self.last_message_time = time.monotonic()
+
+            if self.is_closing:
+                return
 
-    async def _send_last_message(self, room: str) -> None:
+    def _get_last_message(self, room: str) -> str:
         last_message = self.lichess_game.last_message.replace('Engine', 'Evaluation')
         last_message = ' '.join(last_message.split())
 
         if room == 'spectator':
             last_message = self._append_pv(last_message)
 
-        await self.api.send_chat_message(self.game_info.id_, room, last_message)
+        return last_message
 
     def _get_cpu(self) -> str:
         cpu = ''
@@ -9,8 +9,8 @@ import yaml
 
 from configs import (Books_Config, Challenge_Config, ChessDB_Config, Engine_Config, Gaviota_Config,
                      Lichess_Cloud_Config, Matchmaking_Config, Matchmaking_Type_Config, Messages_Config,
-                     Offer_Draw_Config, Online_EGTB_Config, Online_Moves_Config, Opening_Books_Config,
-                     Opening_Explorer_Config, Resign_Config, Syzygy_Config)
+                     Offer_Draw_Config, Online_Cache_Config, Online_EGTB_Config, Online_Moves_Config,
+                     Opening_Books_Config, Opening_Explorer_Config, Resign_Config, Resources_Config, Syzygy_Config)
 
 
 @dataclass
@@ -18,6 +18,7 @@ class Config:
     url: str
     token: str
     engines: dict[str, Engine_Config]
+    resources: Resources_Config
     syzygy: dict[str, Syzygy_Config]
     gaviota: Gaviota_Config
     opening_books: Opening_Books_Config
@@ -46,6 +47,7 @@ class Config:
         cls._check_sections(yaml_config)
 
         engine_configs = cls._get_engine_configs(yaml_config['engines'])
+        resources_config = cls._get_resources_config(yaml_config.get('resources') or {})
         syzygy_config = cls._get_syzygy_configs(yaml_config['syzygy'])
         gaviota_config = cls._get_gaviota_config(yaml_config['gaviota'])
         opening_books_config = cls._get_opening_books_config(yaml_config)
@@ -61,6 +63,7 @@ class Config:
         return cls(yaml_config.get('url', 'https://lichess.org'),
                    yaml_config['token'],
                    engine_configs,
+                   resources_config,
                    syzygy_config,
                    gaviota_config,
                    opening_books_config,
@@ -74,6 +77,15 @@ class Config:
                    blacklist,
                    cls._get_version())
 
+    def get_syzygy_config(self, uci_variant: str | None) -> Syzygy_Config:
+        match uci_variant:
+            case 'chess':
+                return self.syzygy['standard']
+            case 'antichess' | 'atomic':
+                return self.syzygy[uci_variant]
+            case _:
+                return Syzygy_Config(False, [], 0, False, 0.0)
+
     @staticmethod
     def _check_sections(config: dict[str, Any]) -> None:
         # [section, type, error message]
@@ -129,14 +141,34 @@ class Config:
                 raise RuntimeError(f'The engine "{settings["path"]}" doesnt have execute (x) permission. '
                                    f'Try: chmod +x {settings["path"]}')
 
+            if not isinstance(settings.get('hot_spares', 0), int):
+                raise TypeError(f'`engines` `{key}` subsection "hot_spares" must be an integer.')
+
             engine_configs[key] = Engine_Config(settings['path'],
                                                 settings['ponder'],
                                                 settings['silence_stderr'],
                                                 settings.get('move_overhead_multiplier'),
+                                                settings.get('hot_spares', 0),
                                                 settings['uci_options'] or {})
 
         return engine_configs
 
+    @staticmethod
+    def _get_resources_config(resources_section: dict[str, Any]) -> Resources_Config:
+        for key in ('enabled', 'cpu_affinity', 'suspend_pondering'):
+            if not isinstance(resources_section.get(key, False), bool):
+                raise TypeError(f'`resources` subsection "{key}" must be a bool.')
+
+        for key in ('threads', 'hash'):
+            if not isinstance(resources_section.get(key), int | None):
+                raise TypeError(f'`resources` subsection "{key}" must be an integer.')
+
+        return Resources_Config(resources_section.get('enabled', False),
+                                resources_section.get('threads'),
+                                resources_section.get('hash'),
+                                resources_section.get('cpu_affinity', False),
+                                resources_section.get('suspend_pondering', False))
+
     @staticmethod
     def _get_syzygy_configs(syzygy_section: dict[str, dict[str, Any]]) -> dict[str, Syzygy_Config]:
         syzygy_sections = [
@@ -155,8 +187,11 @@ class Config:
                 if not isinstance(settings[subsection[0]], subsection[1]):
                     raise TypeError(f'`syzygy` `{key}` subsection {subsection[2]}')
 
+            if not isinstance(settings.get('timeout', 1.0), int | float):
+                raise TypeError(f'`syzygy` `{key}` subsection "timeout" must be a number.')
+
             if not settings['enabled']:
-                syzygy_configs[key] = Syzygy_Config(False, [], 0, False)
+                syzygy_configs[key] = Syzygy_Config(False, [], 0, False, 0.0)
                 continue
 
             for path in settings['paths']:
@@ -166,7 +201,8 @@ class Config:
             syzygy_configs[key] = Syzygy_Config(settings['enabled'],
                                                 settings['paths'],
                                                 settings['max_pieces'],
-                                                settings['instant_play'])
+                                                settings['instant_play'],
+                                                settings.get('timeout', 1.0))
 
         return syzygy_configs
 
@@ -184,12 +220,18 @@ class Config:
             if not isinstance(gaviota_section[subsection[0]], subsection[1]):
                 raise TypeError(f'`gaviota` subsection {subsection[2]}')
 
+        if not isinstance(gaviota_section.get('timeout', 1.0), int | float):
+            raise TypeError('`gaviota` subsection "timeout" must be a number.')
+
         if gaviota_section['enabled']:
             for path in gaviota_section['paths']:
                 if not os.path.isdir(path):
                     raise RuntimeError(f'Your gaviota directory "{path}" is not a directory.')
 
-        return Gaviota_Config(gaviota_section['enabled'], gaviota_section['paths'], gaviota_section['max_pieces'])
+        return Gaviota_Config(gaviota_section['enabled'],
+                              gaviota_section['paths'],
+                              gaviota_section['max_pieces'],
+                              gaviota_section.get('timeout', 1.0))
 
     @staticmethod
     def _get_opening_books_config(config: dict[str, Any]) -> Opening_Books_Config:
@@ -205,8 +247,11 @@ class Config:
             if not isinstance(config['opening_books'][subsection[0]], subsection[1]):
                 raise TypeError(f'`opening_books` subsection {subsection[2]}')
 
+        if not isinstance(config['opening_books'].get('preload', False), bool):
+            raise TypeError('`opening_books` subsection "preload" must be a bool.')
+
         if not config['opening_books']['enabled']:
-            return Opening_Books_Config(False, 0, None, {})
+            return Opening_Books_Config(False, 0, None, False, {})
 
         opening_book_types_sections = [
             ['selection', str, '"selection" must be one of "weighted_random", "uniform_random" or "best_move".'],
@@ -237,6 +282,7 @@ class Config:
         return Opening_Books_Config(config['opening_books']['enabled'],
                                     config['opening_books']['priority'],
                                     config['opening_books'].get('read_learn'),
+                                    config['opening_books'].get('preload', False),
                                     books)
 
     @staticmethod
@@ -350,7 +396,26 @@ class Config:
                                   online_egtb_section['timeout'])
 
     @staticmethod
-    def _get_online_moves_config(online_moves_section: dict[str, dict[str, Any]]) -> Online_Moves_Config:
+    def _get_online_cache_config(online_cache_section: dict[str, Any]) -> Online_Cache_Config:
+        online_cache_sections = [
+            ['enabled', bool, '"enabled" must be a bool.'],
+            ['path', str, '"path" must be a string wrapped in quotes.'],
+            ['max_entries', int, '"max_entries" must be an integer.']]
+
+        for subsection in online_cache_sections:
+            if subsection[0] not in online_cache_section:
+                raise RuntimeError('Your config does not have required '
+                                   f'`online_moves` `cache` field `{subsection[0]}`.')
+
+            if not isinstance(online_cache_section[subsection[0]], subsection[1]):
+                raise TypeError(f'`online_moves` `cache` field {subsection[2]}')
+
+        return Online_Cache_Config(online_cache_section['enabled'],
+                                   online_cache_section['path'],
+                                   online_cache_section['max_entries'])
+
+    @staticmethod
+    def _get_online_moves_config(online_moves_section: dict[str, Any]) -> Online_Moves_Config:
         online_moves_sections = [
             ['opening_explorer', dict, ('"opening_explorer" must be a dictionary '
                                         'with indented keys followed by colons.')],
@@ -366,10 +431,30 @@ class Config:
             if not isinstance(online_moves_section[subsection[0]], subsection[1]):
                 raise TypeError(f'`online_moves` subsection {subsection[2]}')
 
+        online_moves_options = [
+            ['concurrent_lookups', bool, '"concurrent_lookups" must be a bool.'],
+            ['concurrent_engine', bool, '"concurrent_engine" must be a bool.']]
+
+        for option in online_moves_options:
+            if not isinstance(online_moves_section.get(option[0], False), option[1]):
+                raise TypeError(f'`online_moves` field {option[2]}')
+
+        if 'cache' in online_moves_section:
+            if not isinstance(online_moves_section['cache'], dict):
+                raise TypeError('`online_moves` subsection "cache" must be a dictionary '
+                                'with indented keys followed by colons.')
+
+            online_cache_config = Config._get_online_cache_config(online_moves_section['cache'])
+        else:
+            online_cache_config = Online_Cache_Config(False, '', 0)
+
         return Online_Moves_Config(Config._get_opening_explorer_config(online_moves_section['opening_explorer']),
                                    Config._get_lichess_cloud_config(online_moves_section['lichess_cloud']),
                                    Config._get_chessdb_config(online_moves_section['chessdb']),
-                                   Config._get_online_egtb_config(online_moves_section['online_egtb']))
+                                   Config._get_online_egtb_config(online_moves_section['online_egtb']),
+                                   online_cache_config,
+                                   online_moves_section.get('concurrent_lookups', False),
+                                   online_moves_section.get('concurrent_engine', False))
 
     @staticmethod
     def _get_offer_draw_config(offer_draw_section: dict[str, Any]) -> Offer_Draw_Config:
@@ -456,6 +541,12 @@ class Config:
             if not isinstance(matchmaking_section[subsection[0]], subsection[1]):
                 raise TypeError(f'`matchmaking` subsection {subsection[2]}')
 
+        if not isinstance(matchmaking_section.get('concurrency', 1), int):
+            raise TypeError('`matchmaking` subsection "concurrency" must be an integer.')
+
+        if matchmaking_section.get('concurrency', 1) < 1:
+            raise ValueError('`matchmaking` subsection "concurrency" must be at least 1.')
+
         types: dict[str, Matchmaking_Type_Config] = {}
         for matchmaking_type, matchmaking_options in matchmaking_section['types'].items():
             if not isinstance(matchmaking_options, dict):
@@ -480,7 +571,8 @@ class Config:
         return Matchmaking_Config(matchmaking_section['delay'],
                                   matchmaking_section['timeout'],
                                   matchmaking_section['selection'],
-                                  types)
+                                  types,
+                                  matchmaking_section.get('concurrency', 1))
 
     @staticmethod
     def _get_messages_config(messages_section: dict[str, str]) -> Messages_Config:
@@ -8,15 +8,26 @@ class Engine_Config:
     ponder: bool
     silence_stderr: bool
     move_overhead_multiplier: float | None
+    hot_spares: int
     uci_options: dict[str, Any]
 
 
+@dataclass
+class Resources_Config:
+    enabled: bool
+    threads: int | None
+    hash: int | None
+    cpu_affinity: bool
+    suspend_pondering: bool
+
+
 @dataclass
 class Syzygy_Config:
     enabled: bool
     paths: list[str]
     max_pieces: int
     instant_play: bool
+    timeout: float
 
 
 @dataclass
@@ -24,6 +35,7 @@ class Gaviota_Config:
     enabled: bool
     paths: list[str]
     max_pieces: int
+    timeout: float
 
 
 @dataclass
@@ -38,6 +50,7 @@ class Opening_Books_Config:
     enabled: bool
     priority: int
     read_learn: bool | None
+    preload: bool
     books: dict[str, Books_Config]
 
 
@@ -89,12 +102,22 @@ class Online_EGTB_Config:
     timeout: int
 
 
+@dataclass
+class Online_Cache_Config:
+    enabled: bool
+    path: str
+    max_entries: int
+
+
 @dataclass
 class Online_Moves_Config:
     opening_explorer: Opening_Explorer_Config
     lichess_cloud: Lichess_Cloud_Config
     chessdb: ChessDB_Config
     online_egtb: Online_EGTB_Config
+    cache: Online_Cache_Config
+    concurrent_lookups: bool
+    concurrent_engine: bool
 
 
 @dataclass
@@ -146,6 +169,7 @@ class Matchmaking_Config:
     timeout: int
     selection: Literal['weighted_random', 'sequential']
     types: dict[str, Matchmaking_Type_Config]
+    concurrency: int
 
 
 @dataclass
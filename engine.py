@@ -1,9 +1,13 @@
 import asyncio
 import os
 import subprocess
+import sys
+import time
+from collections.abc import Callable
 
 import chess
 import chess.engine
+import psutil
 
 from configs import Engine_Config, Syzygy_Config
 
@@ -12,33 +16,46 @@ class Engine:
     def __init__(self,
                  transport: asyncio.SubprocessTransport,
                  engine: chess.engine.UciProtocol,
-                 ponder: bool,
+                 engine_config: Engine_Config,
+                 syzygy_config: Syzygy_Config,
                  opponent: chess.engine.Opponent) -> None:
         self.transport = transport
         self.engine = engine
-        self.ponder = ponder
+        self.engine_config = engine_config
+        self.syzygy_config = syzygy_config
+        self.ponder = engine_config.ponder
         self.opponent = opponent
+        self.game = object()
+        self.pending_options: dict[str, int] = {}
+        self.is_thinking = False
+        self.is_pondering = False
+        self.is_suspended = False
+        self.ponder_analysis: chess.engine.AnalysisResult | None = None
+        self.search_time = 0.0
+        self.on_state_change: Callable[[], None] | None = None
 
     @classmethod
     async def from_config(cls,
                           engine_config: Engine_Config,
                           syzygy_config: Syzygy_Config,
-                          opponent: chess.engine.Opponent) -> 'Engine':
+                          opponent: chess.engine.Opponent | None = None) -> 'Engine':
         stderr = subprocess.DEVNULL if engine_config.silence_stderr else None
 
         transport, engine = await chess.engine.popen_uci(engine_config.path, stderr=stderr)
 
         await cls._configure_engine(engine, engine_config, syzygy_config)
-        await engine.send_opponent_information(opponent=opponent)
+        if opponent:
+            await engine.send_opponent_information(opponent=opponent)
 
-        return cls(transport, engine, engine_config.ponder, opponent)
+        return cls(transport, engine, engine_config, syzygy_config,
+                   opponent or chess.engine.Opponent(None, None, None, False))
 
     @classmethod
     async def test(cls, engine_config: Engine_Config) -> None:
         stderr = subprocess.DEVNULL if engine_config.silence_stderr else None
 
         transport, engine = await chess.engine.popen_uci(engine_config.path, stderr=stderr)
-        await cls._configure_engine(engine, engine_config, Syzygy_Config(False, [], 0, False))
+        await cls._configure_engine(engine, engine_config, Syzygy_Config(False, [], 0, False, 0.0))
         result = await engine.play(chess.Board(), chess.engine.Limit(time=0.1), info=chess.engine.INFO_ALL)
 
         if not result.move:
@@ -47,8 +64,9 @@ class Engine:
         await engine.quit()
         transport.close()
 
-    @staticmethod
-    async def _configure_engine(engine: chess.engine.UciProtocol,
+    @classmethod
+    async def _configure_engine(cls,
+                                engine: chess.engine.UciProtocol,
                                 engine_config: Engine_Config,
                                 syzygy_config: Syzygy_Config) -> None:
         for name, value in engine_config.uci_options.items():
@@ -59,20 +77,117 @@ class Engine:
             else:
                 print(f'UCI option "{name}" ignored as it is not supported by the engine.')
 
-        if not syzygy_config.enabled:
-            return
+        await cls._configure_syzygy(engine, engine_config, syzygy_config)
 
+    @staticmethod
+    async def _configure_syzygy(engine: chess.engine.UciProtocol,
+                                engine_config: Engine_Config,
+                                syzygy_config: Syzygy_Config) -> None:
         if 'SyzygyPath' in engine.options and 'SyzygyPath' not in engine_config.uci_options:
             delimiter = ';' if os.name == 'nt' else ':'
-            await engine.configure({'SyzygyPath': delimiter.join(syzygy_config.paths)})
+            await engine.configure({'SyzygyPath': (delimiter.join(syzygy_config.paths)
+                                                   if syzygy_config.enabled
+                                                   else engine.options['SyzygyPath'].default)})
 
         if 'SyzygyProbeLimit' in engine.options and 'SyzygyProbeLimit' not in engine_config.uci_options:
-            await engine.configure({'SyzygyProbeLimit': syzygy_config.max_pieces})
+            await engine.configure({'SyzygyProbeLimit': (syzygy_config.max_pieces
+                                                         if syzygy_config.enabled
+                                                         else engine.options['SyzygyProbeLimit'].default)})
 
     @property
     def name(self) -> str:
         return self.engine.id['name']
 
+    @property
+    def is_alive(self) -> bool:
+        return not self.engine.returncode.done()
+
+    @property
+    def threads(self) -> int:
+        if 'Threads' not in self.engine.options:
+            return 1
+
+        threads = self.engine.config.get('Threads', self.engine.options['Threads'].default)
+        return threads if isinstance(threads, int) else 1
+
+    def get_option_limit(self, name: str) -> int:
+        if name not in self.engine.options:
+            return 1
+
+        limit = self.engine.options[name].max or 1
+        for option_name, value in self.engine_config.uci_options.items():
+            if option_name.lower() == name.lower() and isinstance(value, int):
+                limit = min(value, limit)
+
+        return max(limit, 1)
+
+    def set_resources(self, threads: int, hash_size: int) -> None:
+        for name, value in (('Threads', threads), ('Hash', hash_size)):
+            if name in self.engine.options and self.engine.config.get(name) != value:
+                self.pending_options[name] = value
+            else:
+                self.pending_options.pop(name, None)
+
+    def set_cpu_affinity(self, cores: list[int]) -> None:
+        try:
+            process = psutil.Process(self.transport.get_pid())
+            process.cpu_affinity(cores)
+
+            if sys.platform == 'linux':
+                for thread in process.threads():
+                    psutil.Process(thread.id).cpu_affinity(cores)
+        except psutil.Error as e:
+            print(f'CPU affinity of engine "{self.name}" could not be set: {e}')
+
+    def suspend(self) -> None:
+        if self.is_suspended:
+            return
+
+        try:
+            psutil.Process(self.transport.get_pid()).suspend()
+        except psutil.Error as e:
+            print(f'Engine "{self.name}" could not be suspended: {e}')
+            return
+
+        self.is_suspended = True
+
+    def resume(self) -> None:
+        if not self.is_suspended:
+            return
+
+        self.is_suspended = False
+        try:
+            psutil.Process(self.transport.get_pid()).resume()
+        except psutil.Error as e:
+            print(f'Engine "{self.name}" could not be resumed: {e}')
+
+    async def set_syzygy_config(self, syzygy_config: Syzygy_Config) -> None:
+        if syzygy_config == self.syzygy_config:
+            return
+
+        await self._configure_syzygy(self.engine, self.engine_config, syzygy_config)
+        self.syzygy_config = syzygy_config
+
+    async def new_game(self, opponent: chess.engine.Opponent) -> None:
+        self.ponder = self.engine_config.ponder
+        self.opponent = opponent
+        self.game = object()
+        self.ponder_analysis = None
+        await self._apply_pending_options()
+        await self.engine.send_opponent_information(opponent=opponent)
+
+    async def reset(self) -> bool:
+        self._set_state(False, False)
+        if not self.is_alive:
+            return False
+
+        try:
+            await asyncio.wait_for(self.engine.ping(), 5.0)
+        except (TimeoutError, chess.engine.EngineError):
+            return False
+
+        return True
+
     async def make_move(self,
                         board: chess.Board,
                         white_time: float,
@@ -87,21 +202,51 @@ class Engine:
                                        black_clock=black_time, black_inc=increment)
             ponder = self.ponder
 
-        result = await self.engine.play(board, limit, info=chess.engine.INFO_ALL, ponder=ponder)
+        self._set_state(True, False)
+        try:
+            await self._apply_pending_options()
+            start_time = time.perf_counter()
+            result = await self.engine.play(board, limit, game=self.game, info=chess.engine.INFO_ALL, ponder=ponder)
+            self.search_time = time.perf_counter() - start_time
+        finally:
+            self._set_state(False, False)
 
+        self.ponder_analysis = None
         if not result.move:
-            raise RuntimeError('Engine could not make a move!')
+            raise chess.engine.EngineError('Engine could not make a move!')
 
+        self._set_state(False, ponder and result.ponder is not None)
         return result.move, result.info
 
     async def start_pondering(self, board: chess.Board) -> None:
         if self.ponder:
-            await self.engine.analysis(board)
+            self._set_state(False, False)
+            self.ponder_analysis = await self.engine.analysis(board, game=self.game, info=chess.engine.INFO_PV)
+            self._set_state(False, True)
 
     async def stop_pondering(self, board: chess.Board) -> None:
         if self.ponder:
             self.ponder = False
-            await self.engine.analysis(board, chess.engine.Limit(time=0.001))
+            self.ponder_analysis = None
+            self._set_state(False, False)
+            await self.engine.analysis(board, chess.engine.Limit(time=0.001), game=self.game)
+
+    def _set_state(self, is_thinking: bool, is_pondering: bool) -> None:
+        self.is_thinking = is_thinking
+        self.is_pondering = is_pondering
+
+        if self.on_state_change:
+            self.on_state_change()
+
+    async def _apply_pending_options(self) -> None:
+        if not self.pending_options:
+            return
+
+        options, self.pending_options = self.pending_options, {}
+        await self.engine.configure(options)
+
+    def kill(self) -> None:
+        self.transport.close()
 
     async def close(self) -> None:
         try:
@@ -0,0 +1,148 @@
+import asyncio
+from asyncio import Task
+from collections import defaultdict
+
+import chess.engine
+from chess.variant import find_variant
+
+from config import Config
+from configs import Syzygy_Config
+from engine import Engine
+from ponder_controller import Ponder_Controller
+from resource_budget import Resource_Budget
+
+STANDARD_ENGINE_KEYS = {'standard', 'bullet', 'blitz', 'rapid', 'classical', 'chess960'}
+
+
+class Engine_Pool:
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.idle_engines: defaultdict[str, list[Engine]] = defaultdict(list)
+        self.engine_keys: dict[Engine, str] = {}
+        self.pending_spares: defaultdict[str, int] = defaultdict(int)
+        self.spare_tasks: set[Task[None]] = set()
+        self.resource_budget = Resource_Budget(config.resources)
+        self.ponder_controller = Ponder_Controller(config.resources.suspend_pondering, self.resource_budget.threads)
+
+    def start(self) -> None:
+        self.resource_budget.start()
+
+        for engine_key in self.config.engines:
+            self._replenish(engine_key, self._get_syzygy_config(engine_key))
+
+    async def acquire(self,
+                      engine_key: str,
+                      syzygy_config: Syzygy_Config,
+                      opponent: chess.engine.Opponent,
+                      game_duration: float) -> Engine:
+        for engine in list(self.idle_engines[engine_key]):
+            if not engine.is_alive:
+                print(f'Spare engine "{engine_key}" has terminated and is replaced.')
+                self.idle_engines[engine_key].remove(engine)
+                engine.kill()
+
+        idle_engines = sorted(self.idle_engines[engine_key],
+                              key=lambda engine: engine.syzygy_config != syzygy_config)
+        if idle_engines:
+            engine = idle_engines[0]
+            self.idle_engines[engine_key].remove(engine)
+            await engine.set_syzygy_config(syzygy_config)
+        else:
+            engine = await self._spawn_engine(engine_key, syzygy_config)
+
+        self._replenish(engine_key, syzygy_config)
+        await self._start_game(engine, engine_key, opponent, game_duration)
+        return engine
+
+    async def restart(self, engine: Engine) -> Engine:
+        engine_key = self.engine_keys[engine]
+        new_engine = await self._spawn_engine(engine_key, engine.syzygy_config)
+        game_duration = self.resource_budget.game_durations.get(engine, 0.0)
+        try:
+            await self._start_game(new_engine, engine_key, engine.opponent, game_duration)
+        except (OSError, chess.engine.EngineError):
+            self._end_game(new_engine)
+            new_engine.kill()
+            raise
+
+        self._end_game(engine)
+        engine.kill()
+        return new_engine
+
+    async def release(self, engine: Engine) -> None:
+        engine_key = self._end_game(engine)
+        spare_count = len(self.idle_engines[engine_key]) + self.pending_spares[engine_key]
+        if spare_count >= self.config.engines[engine_key].hot_spares:
+            await engine.close()
+            return
+
+        if not await engine.reset():
+            print('Engine did not respond and is not kept as spare.')
+            await engine.close()
+            return
+
+        self.resource_budget.pin_to_engine_cores(engine)
+        self.idle_engines[engine_key].append(engine)
+
+    async def close(self) -> None:
+        for task in self.spare_tasks:
+            task.cancel()
+
+        for engines in self.idle_engines.values():
+            for engine in engines:
+                await engine.close()
+
+        self.idle_engines.clear()
+
+    async def _spawn_engine(self, engine_key: str, syzygy_config: Syzygy_Config) -> Engine:
+        engine = await Engine.from_config(self.config.engines[engine_key], syzygy_config)
+        self.resource_budget.pin_to_engine_cores(engine)
+        return engine
+
+    async def _start_game(self,
+                          engine: Engine,
+                          engine_key: str,
+                          opponent: chess.engine.Opponent,
+                          game_duration: float) -> None:
+        self.engine_keys[engine] = engine_key
+        self.resource_budget.add_engine(engine, game_duration)
+        await engine.new_game(opponent)
+        self.ponder_controller.add_engine(engine)
+
+    def _end_game(self, engine: Engine) -> str:
+        self.resource_budget.remove_engine(engine)
+        self.ponder_controller.remove_engine(engine)
+        return self.engine_keys.pop(engine)
+
+    def _replenish(self, engine_key: str, syzygy_config: Syzygy_Config) -> None:
+        missing_spares = (self.config.engines[engine_key].hot_spares -
+                          len(self.idle_engines[engine_key]) -
+                          self.pending_spares[engine_key])
+
+        for _ in range(missing_spares):
+            self.pending_spares[engine_key] += 1
+            task = asyncio.create_task(self._start_spare(engine_key, syzygy_config))
+            self.spare_tasks.add(task)
+            task.add_done_callback(self.spare_tasks.discard)
+
+    async def _start_spare(self, engine_key: str, syzygy_config: Syzygy_Config) -> None:
+        try:
+            engine = await self._spawn_engine(engine_key, syzygy_config)
+        except (OSError, chess.engine.EngineError) as e:
+            print(f'Spare engine "{engine_key}" could not be started: {e}')
+            return
+        finally:
+            self.pending_spares[engine_key] -= 1
+
+        self.idle_engines[engine_key].append(engine)
+
+    def _get_syzygy_config(self, engine_key: str) -> Syzygy_Config:
+        variant_key = engine_key.removesuffix('_white').removesuffix('_black')
+
+        if variant_key in STANDARD_ENGINE_KEYS:
+            return self.config.get_syzygy_config('chess')
+
+        try:
+            return self.config.get_syzygy_config(find_variant(variant_key).uci_variant)
+        except ValueError:
+            return self.config.get_syzygy_config(None)
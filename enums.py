@@ -52,3 +52,11 @@ class Perf_Type(StrEnum):
 class Busy_Reason(StrEnum):
     OFFLINE = 'offline'
     PLAYING = 'playing'
+
+
+class Request_Type(StrEnum):
+    CHALLENGE = 'challenge'
+    CHAT = 'chat'
+    STATUS = 'status'
+    ACCOUNT = 'account'
+    CLOUD = 'cloud'
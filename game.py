@@ -3,82 +3,113 @@ from typing import Any
 
 from api import API
 from botli_dataclasses import Game_Information
+from book_registry import Book_Registry
 from chatter import Chatter
 from config import Config
+from engine_pool import Engine_Pool
 from lichess_game import Lichess_Game
+from move_overhead import Move_Overhead_Tracker
+from tablebase_service import Tablebase_Service
 
 
 class Game:
-    def __init__(self, api: API, config: Config, username: str, game_id: str) -> None:
+    def __init__(self,
+                 api: API,
+                 config: Config,
+                 username: str,
+                 game_id: str,
+                 engine_pool: Engine_Pool,
+                 book_registry: Book_Registry,
+                 tablebase_service: Tablebase_Service,
+                 move_overhead_tracker: Move_Overhead_Tracker) -> None:
         self.api = api
         self.config = config
         self.username = username
         self.game_id = game_id
+        self.engine_pool = engine_pool
+        self.book_registry = book_registry
+        self.tablebase_service = tablebase_service
+        self.move_overhead_tracker = move_overhead_tracker
         self.was_aborted = False
         self.move_task: asyncio.Task[None] | None = None
 
     async def run(self) -> None:
         game_stream_queue: asyncio.Queue[dict[str, Any]] = asyncio.Queue()
         asyncio.create_task(self.api.get_game_stream(self.game_id, game_stream_queue))
+        asyncio.create_task(self.api.warm_up_move_connection())
         info = Game_Information.from_gameFull_event(await game_stream_queue.get())
-        lichess_game = await Lichess_Game.acreate(self.api, self.config, self.username, info)
+        lichess_game = await Lichess_Game.acreate(self.api, self.config, self.username, info,
+                                                  self.engine_pool, self.book_registry, self.tablebase_service,
+                                                  self.move_overhead_tracker)
         chatter = Chatter(self.api, self.config, self.username, info, lichess_game)
 
-        self._print_game_information(info)
+        try:
+            self._print_game_information(info)
 
-        if info.state['status'] != 'started':
-            self._print_result_message(info.state, lichess_game, info)
-            await chatter.send_goodbyes()
-            await lichess_game.close()
-            return
-
-        await chatter.send_greetings()
-
-        if lichess_game.is_our_turn:
-            await self._make_move(lichess_game, chatter)
-        else:
-            await lichess_game.start_pondering()
-
-        opponent_title = info.black_title if lichess_game.is_white else info.white_title
-        abortion_seconds = 30 if opponent_title == 'BOT' else 60
-        abortion_task = asyncio.create_task(self._abortion_task(lichess_game, chatter, abortion_seconds))
-
-        while event := await game_stream_queue.get():
-            match event['type']:
-                case 'chatLine':
-                    await chatter.handle_chat_message(event)
-                    continue
-                case 'opponentGone':
-                    if event.get('claimWinInSeconds') == 0:
-                        await self.api.claim_victory(self.game_id)
-                    continue
-                case 'gameFull':
-                    event = event['state']
-
-            lichess_game.update(event)
+            if info.state['status'] != 'started':
+                self._print_result_message(info.state, lichess_game, info)
+                chatter.send_goodbyes()
+                return
 
-            if event['status'] != 'started':
-                if self.move_task:
-                    self.move_task.cancel()
+            chatter.send_greetings()
 
-                self._print_result_message(event, lichess_game, info)
-                await chatter.send_goodbyes()
-                break
-
-            if lichess_game.is_our_turn and not lichess_game.board.is_repetition():
-                self.move_task = asyncio.create_task(self._make_move(lichess_game, chatter))
-
-        abortion_task.cancel()
-        self.was_aborted = lichess_game.is_abortable
-        await lichess_game.close()
+            if lichess_game.is_our_turn:
+                await self._make_move(lichess_game, chatter)
+            else:
+                await lichess_game.start_pondering()
+
+            opponent_title = info.black_title if lichess_game.is_white else info.white_title
+            abortion_seconds = 30 if opponent_title == 'BOT' else 60
+            abortion_task = asyncio.create_task(self._abortion_task(lichess_game, chatter, abortion_seconds))
+
+            while event := await game_stream_queue.get():
+                match event['type']:
+                    case 'chatLine':
+                        chatter.handle_chat_message(event)
+                        continue
+                    case 'opponentGone':
+                        if event.get('claimWinInSeconds') == 0:
+                            await self.api.claim_victory(self.game_id)
+                        continue
+                    case 'gameFull':
+                        event = event['state']
+
+                lichess_game.update(event)
+
+                if event['status'] != 'started':
+                    if self.move_task:
+                        self.move_task.cancel()
+
+                    self._print_result_message(event, lichess_game, info)
+                    chatter.send_goodbyes()
+                    break
+
+                if lichess_game.is_our_turn and not lichess_game.is_repetition:
+                    self.move_task = asyncio.create_task(self._make_move(lichess_game, chatter))
+
+            abortion_task.cancel()
+            self.was_aborted = lichess_game.is_abortable
+        finally:
+            chatter.close()
+            await lichess_game.close()
 
     async def _make_move(self, lichess_game: Lichess_Game, chatter: Chatter) -> None:
         lichess_move = await lichess_game.make_move()
         if lichess_move.resign:
-            await self.api.resign_game(self.game_id)
+            move_submission = await self.api.resign_game(self.game_id, lichess_game.move_deadline)
+            lichess_game.print_move()
         else:
-            await self.api.send_move(self.game_id, lichess_move.uci_move, lichess_move.offer_draw)
-            await chatter.print_eval()
+            move_submission = await self.api.send_move(self.game_id, lichess_move.uci_move,
+                                                       lichess_move.offer_draw, lichess_game.move_deadline)
+            lichess_game.print_move()
+            chatter.print_eval()
+
+        if move_submission.was_sent:
+            self.move_overhead_tracker.add_round_trip(move_submission.latency)
+
+        if move_submission.attempts > 1 or not move_submission.was_sent:
+            print(f'Move {"sent" if move_submission.was_sent else "not sent"} after '
+                  f'{move_submission.attempts} attempts in {move_submission.latency * 1000:.0f} ms.')
         self.move_task = None
 
     async def _abortion_task(self, lichess_game: Lichess_Game, chatter: Chatter, abortion_seconds: int) -> None:
@@ -87,7 +118,7 @@ class Game:
         if not lichess_game.is_our_turn and lichess_game.is_abortable:
             print('Aborting game ...')
             await self.api.abort_game(self.game_id)
-            await chatter.send_abortion_message()
+            chatter.send_abortion_message()
 
     def _print_game_information(self, info: Game_Information) -> None:
         opponents_str = f'{info.white_str}   -   {info.black_str}'
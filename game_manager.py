@@ -3,12 +3,18 @@ from asyncio import Event, Task
 from collections import deque
 from typing import Any
 
+import aiohttp
+
 from api import API
-from botli_dataclasses import Challenge, Challenge_Request, Tournament, Tournament_Request
+from book_registry import Book_Registry
+from botli_dataclasses import Challenge, Challenge_Request, Challenge_Response, Tournament, Tournament_Request
 from challenger import Challenger
 from config import Config
+from engine_pool import Engine_Pool
 from game import Game
 from matchmaking import Matchmaking
+from move_overhead import Move_Overhead_Tracker
+from tablebase_service import Tablebase_Service
 
 
 class Game_Manager:
@@ -18,14 +24,20 @@ class Game_Manager:
         self.username = username
 
         self.challenger = Challenger(api)
+        self.book_registry = Book_Registry(config.opening_books)
         self.changed_event = Event()
+        self.engine_pool = Engine_Pool(config)
         self.matchmaking = Matchmaking(api, config, username)
+        self.move_overhead_tracker = Move_Overhead_Tracker()
+        self.tablebase_service = Tablebase_Service(config)
 
         self.challenge_requests: deque[Challenge_Request] = deque()
-        self.current_matchmaking_game_id: str | None = None
+        self.challenge_tasks: set[Task[None]] = set()
         self.is_rate_limited = False
         self.is_running = True
         self.matchmaking_enabled = False
+        self.matchmaking_game_ids: set[str] = set()
+        self.matchmaking_task: Task[None] | None = None
         self.next_matchmaking: float | None = None
         self.open_challenges: deque[Challenge] = deque()
         self.reserved_game_spots = 0
@@ -42,12 +54,16 @@ class Game_Manager:
         self.changed_event.set()
 
     async def run(self) -> None:
+        self.book_registry.start()
+        self.engine_pool.start()
+        self.tablebase_service.start()
+
         while self.is_running:
             try:
                 async with asyncio.timeout_at(self.next_matchmaking):
                     await self.changed_event.wait()
             except TimeoutError:
-                await self._check_matchmaking()
+                self._check_matchmaking()
                 continue
 
             self.changed_event.clear()
@@ -68,7 +84,15 @@ class Game_Manager:
                 await self._accept_challenge(challenge)
 
             while challenge_request := self._get_next_challenge_request():
-                await self._create_challenge(challenge_request)
+                challenge_task = asyncio.create_task(self._create_challenge(challenge_request))
+                challenge_task.add_done_callback(self._challenge_task_callback)
+                self.challenge_tasks.add(challenge_task)
+
+        if self.matchmaking_task:
+            self.matchmaking_task.cancel()
+
+        for challenge_task in self.challenge_tasks:
+            challenge_task.cancel()
 
         for tournament in self.unstarted_tournaments.values():
             tournament.cancel()
@@ -80,9 +104,16 @@ class Game_Manager:
         for task in list(self.tasks):
             await task
 
+        await self.engine_pool.close()
+        self.book_registry.close()
+        self.tablebase_service.close()
+        self.matchmaking.close()
+
     @property
     def is_busy(self) -> bool:
-        return len(self.tasks) + len(self.tournaments) + self.reserved_game_spots >= self.config.challenge.concurrency
+        reserved_game_spots = (self.reserved_game_spots + len(self.challenge_tasks) +
+                               (self.matchmaking_task is not None))
+        return len(self.tasks) + len(self.tournaments) + reserved_game_spots >= self.config.challenge.concurrency
 
     def add_challenge(self, challenge: Challenge) -> None:
         if challenge not in self.open_challenges:
@@ -209,13 +240,21 @@ class Game_Manager:
     def _task_callback(self, task: Task[None]) -> None:
         game = self.tasks.pop(task)
 
-        if game.game_id == self.current_matchmaking_game_id:
-            self.matchmaking.on_game_finished(game.was_aborted)
-            self.current_matchmaking_game_id = None
+        if game.game_id in self.matchmaking_game_ids:
+            self.matchmaking_game_ids.discard(game.game_id)
+            self.matchmaking.on_game_finished(game.game_id, game.was_aborted)
 
         self._set_next_matchmaking(self.config.matchmaking.delay)
         self.changed_event.set()
 
+    def _challenge_task_callback(self, task: Task[None]) -> None:
+        self.challenge_tasks.discard(task)
+        self.changed_event.set()
+
+    def _reserve_game_spot(self, game_id: str | None) -> None:
+        if game_id not in {game.game_id for game in self.tasks.values()}:
+            self.reserved_game_spots += 1
+
     async def _start_game(self, game_event: dict[str, Any]) -> None:
         if self.reserved_game_spots > 0:
             self.reserved_game_spots -= 1
@@ -227,7 +266,8 @@ class Game_Manager:
             self.tournaments[tournament.id_] = tournament
             print(f'External joined tournament "{tournament.name}" detected.')
 
-        game = Game(self.api, self.config, self.username, game_event['id'])
+        game = Game(self.api, self.config, self.username, game_event['id'],
+                    self.engine_pool, self.book_registry, self.tablebase_service, self.move_overhead_tracker)
         task = asyncio.create_task(game.run())
         task.add_done_callback(self._task_callback)
         self.tasks[task] = game
@@ -247,24 +287,40 @@ class Game_Manager:
         else:
             print(f'Challenge "{challenge.challenge_id}" could not be accepted!')
 
-    async def _check_matchmaking(self) -> None:
+    def _check_matchmaking(self) -> None:
         self.next_matchmaking = None
         self.is_rate_limited = False
 
-        if self.current_matchmaking_game_id:
+        if len(self.matchmaking_game_ids) >= self.config.matchmaking.concurrency or self.matchmaking_task:
             return
 
         if self.is_busy:
             return
 
-        challenge_response = await self.matchmaking.create_challenge()
+        self.matchmaking_task = asyncio.create_task(self._matchmaking_task())
+
+    async def _matchmaking_task(self) -> None:
+        try:
+            challenge_response = await self.matchmaking.create_challenge()
+            self._handle_challenge_response(challenge_response)
+        except (aiohttp.ClientError, KeyError, OSError, TimeoutError, ValueError) as e:
+            print(f'Matchmaking failed: {e!r}')
+        finally:
+            self.matchmaking_task = None
+            if self.next_matchmaking is None:
+                self._set_next_matchmaking(self.config.matchmaking.delay)
+            self.changed_event.set()
+
+    def _handle_challenge_response(self, challenge_response: Challenge_Response | None) -> None:
         if challenge_response is None:
             self._set_next_matchmaking(1)
             return
 
-        if challenge_response.success:
-            self.reserved_game_spots += 1
-            self.current_matchmaking_game_id = challenge_response.challenge_id
+        if challenge_response.success and challenge_response.challenge_id:
+            self._reserve_game_spot(challenge_response.challenge_id)
+            self.matchmaking_game_ids.add(challenge_response.challenge_id)
+            if len(self.matchmaking_game_ids) < self.config.matchmaking.concurrency:
+                self._set_next_matchmaking(1)
             return
 
         if challenge_response.no_opponent:
@@ -312,7 +368,7 @@ class Game_Manager:
         response = await self.challenger.create(challenge_request)
 
         if response.success:
-            self.reserved_game_spots += 1
+            self._reserve_game_spot(response.challenge_id)
         elif response.has_reached_rate_limit and self.challenge_requests:
             print('Challenge queue cleared due to rate limiting.')
             self.challenge_requests.clear()
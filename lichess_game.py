@@ -1,24 +1,29 @@
+import asyncio
 import random
 import struct
 import time
-from collections.abc import Awaitable, Callable, Iterable
+from collections import defaultdict
+from collections.abc import Awaitable, Callable
 from itertools import islice
 from typing import Any, Literal
 
 import chess
 import chess.engine
-import chess.gaviota
 import chess.polyglot
-import chess.syzygy
 from chess.variant import find_variant
 
 from api import API
+from book_registry import Book_Registry
 from botli_dataclasses import (Book_Settings, Game_Information, Gaviota_Result, Lichess_Move, Move_Response,
                                Syzygy_Result)
 from config import Config
-from configs import Engine_Config, Syzygy_Config
 from engine import Engine
+from engine_pool import Engine_Pool
 from enums import Variant
+from move_overhead import Move_Overhead_Tracker
+from move_watchdog import MOVE_ERRORS, Move_Watchdog
+from position_history import Position_History
+from tablebase_service import Tablebase_Service
 
 
 class Lichess_Game:
@@ -28,45 +33,64 @@ class Lichess_Game:
                  username: str,
                  game_info: Game_Information,
                  board: chess.Board,
-                 syzygy_config: Syzygy_Config,
-                 engine_key: str,
-                 engine: Engine) -> None:
+                 engine: Engine,
+                 engine_pool: Engine_Pool,
+                 book_registry: Book_Registry,
+                 tablebase_service: Tablebase_Service,
+                 move_overhead_tracker: Move_Overhead_Tracker) -> None:
         self.api = api
         self.config = config
         self.game_info = game_info
         self.board = board
-        self.syzygy_config = syzygy_config
+        self.position_history = Position_History(board)
+        self.syzygy_config = engine.syzygy_config
+        self.book_registry = book_registry
+        self.tablebase_service = tablebase_service
+        self.move_overhead_tracker = move_overhead_tracker
         self.white_time: float = self.game_info.state['wtime'] / 1000
         self.black_time: float = self.game_info.state['btime'] / 1000
         self.increment = self.game_info.increment_ms / 1000
         self.is_white = self.game_info.white_name == username
+        self.clock_deadline = time.perf_counter() + self.own_time
         self.book_settings = self._get_book_settings()
-        self.syzygy_tablebase = self._get_syzygy_tablebase()
-        self.gaviota_tablebase = self._get_gaviota_tablebase()
         self.move_sources = self._get_move_sources()
 
-        self.opening_explorer_counter = 0
+        self.syzygy_wdls: dict[int, int | None] = {}
+        self.syzygy_dtzs: dict[int, int | None] = {}
+        self.move_counters: defaultdict[Callable[[], Awaitable[Move_Response | None]], int] = defaultdict(int)
         self.out_of_opening_explorer_counter = 0
-        self.cloud_counter = 0
         self.out_of_cloud_counter = 0
-        self.chessdb_counter = 0
         self.out_of_chessdb_counter = 0
-        self.move_overhead = self._get_move_overhead(config.engines[engine_key])
+        self.expected_own_time: float | None = None
         self.engine = engine
+        self.engine_pool = engine_pool
+        self.move_watchdog = Move_Watchdog(engine_pool)
         self.scores: list[chess.engine.PovScore] = []
         self.last_message = 'No eval available yet.'
         self.last_pv: list[chess.Move] = []
+        self.unprinted_move: tuple[chess.Board, Move_Response] | None = None
+        self.is_waiting_for_engine = False
 
     @classmethod
-    async def acreate(cls, api: API, config: Config, username: str, game_info: Game_Information) -> 'Lichess_Game':
+    async def acreate(cls,
+                      api: API,
+                      config: Config,
+                      username: str,
+                      game_info: Game_Information,
+                      engine_pool: Engine_Pool,
+                      book_registry: Book_Registry,
+                      tablebase_service: Tablebase_Service,
+                      move_overhead_tracker: Move_Overhead_Tracker) -> 'Lichess_Game':
         board = cls._get_board(game_info)
         is_white = game_info.white_name == username
         engine_key = cls._get_engine_key(config, board, is_white, game_info)
-        syzygy_config = cls._get_syzygy_config(config, board)
-        engine = await Engine.from_config(config.engines[engine_key],
-                                          syzygy_config,
-                                          game_info.black_opponent if is_white else game_info.white_opponent)
-        return cls(api, config, username, game_info, board, syzygy_config, engine_key, engine)
+        syzygy_config = config.get_syzygy_config(board.uci_variant)
+        engine = await engine_pool.acquire(engine_key,
+                                           syzygy_config,
+                                           game_info.black_opponent if is_white else game_info.white_opponent,
+                                           (game_info.initial_time_ms + 40 * game_info.increment_ms) / 1000)
+        return cls(api, config, username, game_info, board, engine, engine_pool, book_registry, tablebase_service,
+                   move_overhead_tracker)
 
     @staticmethod
     def _get_board(game_info: Game_Information) -> chess.Board:
@@ -124,55 +148,106 @@ class Lichess_Game:
 
         raise RuntimeError(f'No suitable engine for "{board.uci_variant}" configured.')
 
-    @classmethod
-    def _get_syzygy_config(cls, config: Config, board: chess.Board) -> Syzygy_Config:
-        match board.uci_variant:
-            case 'chess':
-                return config.syzygy['standard']
-            case 'antichess':
-                return config.syzygy['antichess']
-            case 'atomic':
-                return config.syzygy['atomic']
-            case _:
-                return Syzygy_Config(False, [], 0, False)
-
     async def make_move(self) -> Lichess_Move:
-        for move_source in self.move_sources:
-            if move_response := await move_source():
-                break
-        else:
-            move, info = await self.engine.make_move(self.board, *self.engine_times)
-
-            if 'score' in info:
-                self.scores.append(info['score'])
-            message = f'Engine:  {self._format_move(move):14} {self._format_engine_info(info)}'
-            move_response = Move_Response(move, message,
-                                          pv=info.get('pv', []),
-                                          is_engine_move=len(self.board.move_stack) > 1)
-
-        self.board.push(move_response.move)
+        timeout = self.move_watchdog.get_timeout(self.is_abortable, self.own_time,
+                                                 self.engine_times[0 if self.is_white else 1])
+        self.is_waiting_for_engine = False
+        move_responses = (self._get_concurrent_move_response() if self.config.online_moves.concurrent_lookups
+                          else self._get_sequential_move_response())
+        try:
+            move_response = await asyncio.wait_for(move_responses, timeout)
+        except MOVE_ERRORS as e:
+            is_engine_error = self.is_waiting_for_engine and isinstance(e, (TimeoutError, chess.engine.EngineError))
+            move = await self.move_watchdog.fire(self.board, self.engine, self.last_pv, self._make_book_move, e,
+                                                 is_engine_error)
+            move_response = Move_Response(move, self._get_message_formatter('Fallback', move))
+
+        self.unprinted_move = (self.board.copy(stack=False), move_response)
+        self.position_history.push(move_response.move)
         if not move_response.is_engine_move:
             await self.engine.start_pondering(self.board)
 
-        print(f'{move_response.public_message} {move_response.private_message}'.strip())
-        self.last_message = move_response.public_message
         self.last_pv = move_response.pv
 
         return Lichess_Move(move_response.move.uci(), self._offer_draw(move_response), self._resign(move_response))
 
+    def print_move(self) -> None:
+        if not self.unprinted_move:
+            return
+
+        board, move_response = self.unprinted_move
+        self.unprinted_move = None
+        self.last_message = move_response.format_message(board)
+        print(f'{self.last_message} {move_response.private_message}'.strip())
+
+    async def _get_sequential_move_response(self) -> Move_Response:
+        for move_source in self.move_sources:
+            if move_response := await move_source():
+                self.move_counters[move_source] += 1
+                return move_response
+
+        self.engine = await self.move_watchdog.get_engine(self.engine)
+        self.is_waiting_for_engine = True
+        return self._get_engine_move_response(*await self.engine.make_move(self.board, *self.engine_times))
+
+    async def _get_concurrent_move_response(self) -> Move_Response:
+        self.engine = await self.move_watchdog.get_engine(self.engine)
+        start_time = time.perf_counter()
+        source_tasks = [asyncio.ensure_future(move_source()) for move_source in self.move_sources]
+        engine_task = (asyncio.create_task(self.engine.make_move(self.board, *self.engine_times))
+                       if self.config.online_moves.concurrent_engine else None)
+
+        try:
+            for move_source, source_task in zip(self.move_sources, source_tasks):
+                if move_response := await source_task:
+                    self.move_counters[move_source] += 1
+                    return move_response
+
+            self.is_waiting_for_engine = True
+            if engine_task:
+                return self._get_engine_move_response(*await engine_task)
+
+            self._reduce_own_time(time.perf_counter() - start_time)
+            return self._get_engine_move_response(*await self.engine.make_move(self.board, *self.engine_times))
+        finally:
+            for source_task in source_tasks:
+                source_task.cancel()
+
+            if engine_task:
+                engine_task.cancel()
+
+    def _get_engine_move_response(self, move: chess.Move, info: chess.engine.InfoDict) -> Move_Response:
+        if 'score' in info:
+            self.scores.append(info['score'])
+        self.expected_own_time = self.own_time - self.engine.search_time + self.increment
+        return Move_Response(move,
+                             lambda board: f'Engine:  {self._format_move(board, move):14} '
+                                           f'{self._format_engine_info(board, info)}',
+                             pv=info.get('pv', []),
+                             is_engine_move=len(self.board.move_stack) > 1)
+
     def update(self, gameState_event: dict[str, Any]) -> None:
         moves = gameState_event['moves'].split()
         if len(moves) <= len(self.board.move_stack):
+            if self.expected_own_time is not None and len(self.board.move_stack) > 2:
+                self.move_overhead_tracker.add_sample(self.game_info, self.expected_own_time,
+                                                      gameState_event['wtime' if self.is_white else 'btime'])
+            self.expected_own_time = None
             return
 
-        self.board.push(chess.Move.from_uci(moves[-1]))
+        self.position_history.push(chess.Move.from_uci(moves[-1]))
         self.white_time = gameState_event['wtime'] / 1000
         self.black_time = gameState_event['btime'] / 1000
+        self.clock_deadline = time.perf_counter() + self.own_time
 
     @property
     def is_our_turn(self) -> bool:
         return self.is_white == self.board.turn
 
+    @property
+    def is_repetition(self) -> bool:
+        return self.position_history.is_repetition()
+
     @property
     def is_abortable(self) -> bool:
         return len(self.board.move_stack) < 2
@@ -186,36 +261,28 @@ class Lichess_Game:
         return self.black_time if self.is_white else self.white_time
 
     @property
-    def engine_times(self) -> tuple[float, float, float]:
-        if self.is_white:
-            if self.white_time > self.move_overhead:
-                white_time = self.white_time - self.move_overhead
-            else:
-                white_time = self.white_time / 2.0
+    def move_deadline(self) -> float:
+        if self.is_abortable:
+            return time.perf_counter() + 10.0
 
-            return white_time, self.black_time, self.increment
+        remaining_time = self.clock_deadline - time.perf_counter()
+        return time.perf_counter() + min(max(remaining_time, 0.5), 10.0)
 
-        if self.black_time > self.move_overhead:
-            black_time = self.black_time - self.move_overhead
-        else:
-            black_time = self.black_time / 2.0
+    @property
+    def engine_times(self) -> tuple[float, float, float]:
+        move_overhead = self.move_overhead_tracker.get_move_overhead(self.game_info, self.engine.engine_config)
+        own_time = self.own_time - move_overhead if self.own_time > move_overhead else self.own_time / 2.0
+
+        if self.is_white:
+            return own_time, self.black_time, self.increment
 
-        return self.white_time, black_time, self.increment
+        return self.white_time, own_time, self.increment
 
     async def start_pondering(self) -> None:
         await self.engine.start_pondering(self.board)
 
     async def close(self) -> None:
-        await self.engine.close()
-
-        for book_reader in self.book_settings.readers.values():
-            book_reader.close()
-
-        if self.syzygy_tablebase:
-            self.syzygy_tablebase.close()
-
-        if self.gaviota_tablebase:
-            self.gaviota_tablebase.close()
+        await self.engine_pool.release(await self.move_watchdog.get_engine(self.engine))
 
     def _offer_draw(self, move_response: Move_Response) -> bool:
         if not self.config.offer_draw.enabled:
@@ -295,9 +362,9 @@ class Lichess_Game:
             weight = entry.weight / sum(entry.weight for entry in entries) * 100.0
             learn = entry.learn if self.config.opening_books.read_learn else 0
             name = name if len(self.book_settings.readers) > 1 else ''
-            public_message = f'Book:    {self._format_move(entry.move):14}'
             private_message = f'{self._format_book_info(weight, learn)}     {name}'
-            return Move_Response(entry.move, public_message, private_message=private_message)
+            return Move_Response(entry.move, self._get_message_formatter('Book:   ', entry.move),
+                                 private_message=private_message)
 
     def _get_book_settings(self) -> Book_Settings:
         if not self.config.opening_books.enabled:
@@ -310,8 +377,7 @@ class Lichess_Game:
         books_config = self.config.opening_books.books[key]
         return Book_Settings(books_config.selection,
                              books_config.max_depth,
-                             {name: chess.polyglot.open_reader(path)
-                              for name, path in books_config.names.items()})
+                             self.book_registry.get_readers(books_config))
 
     def _get_book_key(self) -> str | None:
         color = 'white' if self.is_white else 'black'
@@ -354,9 +420,10 @@ class Lichess_Game:
                     if self.config.online_moves.opening_explorer.max_depth is None
                     else self.board.ply() >= self.config.online_moves.opening_explorer.max_depth)
         out_of_range = self.board.fullmove_number > 25
+        max_moves = self.config.online_moves.opening_explorer.max_moves
         too_many_moves = (False
-                          if self.config.online_moves.opening_explorer.max_moves is None
-                          else self.opening_explorer_counter >= self.config.online_moves.opening_explorer.max_moves)
+                          if max_moves is None
+                          else self.move_counters[self._make_opening_explorer_move] >= max_moves)
         has_time = self._has_time(self.config.online_moves.opening_explorer.min_time)
 
         if out_of_book or too_deep or out_of_range or too_many_moves or not has_time:
@@ -382,7 +449,7 @@ class Lichess_Game:
                                                        self.config.online_moves.opening_explorer.timeout)
         if response is None:
             self.out_of_opening_explorer_counter += 1
-            self._reduce_own_time(time.perf_counter() - start_time)
+            self._charge_lookup_time(start_time)
             return
 
         game_count = response['white'] + response['draws'] + response['black']
@@ -407,11 +474,9 @@ class Lichess_Game:
         if self._is_repetition(move):
             return
 
-        self.opening_explorer_counter += 1
-        public_message = f'Explore: {self._format_move(move):14}'
         private_message = (f'Performance: {top_move["performance"]}      '
                            f'WDL: {top_move["wins"]}/{top_move["draws"]}/{top_move["losses"]}')
-        return Move_Response(move, public_message, private_message=private_message)
+        return Move_Response(move, self._get_message_formatter('Explore:', move), private_message=private_message)
 
     def _get_opening_explorer_top_move(self, moves: list[dict[str, Any]]) -> dict[str, Any]:
         if self.config.online_moves.opening_explorer.selection == 'win_rate':
@@ -434,9 +499,8 @@ class Lichess_Game:
         too_deep = (False
                     if self.config.online_moves.lichess_cloud.max_depth is None
                     else self.board.ply() >= self.config.online_moves.lichess_cloud.max_depth)
-        too_many_moves = (False
-                          if self.config.online_moves.lichess_cloud.max_moves is None
-                          else self.cloud_counter >= self.config.online_moves.lichess_cloud.max_moves)
+        max_moves = self.config.online_moves.lichess_cloud.max_moves
+        too_many_moves = False if max_moves is None else self.move_counters[self._make_cloud_move] >= max_moves
         has_time = self._has_time(self.config.online_moves.lichess_cloud.min_time)
 
         if out_of_book or too_deep or too_many_moves or not has_time:
@@ -448,14 +512,13 @@ class Lichess_Game:
                                                  self.config.online_moves.lichess_cloud.timeout)
         if response is None:
             self.out_of_cloud_counter += 1
-            self._reduce_own_time(time.perf_counter() - start_time)
+            self._charge_lookup_time(start_time)
             return
 
-        if 'error' in response:
-            self.out_of_cloud_counter += 1
+        if 'skipped' in response:
             return
 
-        if response['depth'] < self.config.online_moves.lichess_cloud.min_eval_depth:
+        if 'error' in response or response['depth'] < self.config.online_moves.lichess_cloud.min_eval_depth:
             self.out_of_cloud_counter += 1
             return
 
@@ -469,20 +532,19 @@ class Lichess_Game:
         else:
             score = chess.engine.Cp(response['pvs'][0]['cp'])
 
-        self.cloud_counter += 1
-        message = (f'Cloud:   {self._format_move(pv[0]):14} '
-                   f'{self._format_score(chess.engine.PovScore(score, chess.WHITE))}     '
-                   f'Depth: {response["depth"]}')
-        return Move_Response(pv[0], message, pv=pv)
+        return Move_Response(pv[0],
+                             lambda board: (f'Cloud:   {self._format_move(board, pv[0]):14} '
+                                            f'{self._format_score(board, chess.engine.PovScore(score, chess.WHITE))}'
+                                            f'     Depth: {response["depth"]}'),
+                             pv=pv)
 
     async def _make_chessdb_move(self) -> Move_Response | None:
         out_of_book = self.out_of_chessdb_counter >= 5
         too_deep = (False
                     if self.config.online_moves.chessdb.max_depth is None
                     else self.board.ply() >= self.config.online_moves.chessdb.max_depth)
-        too_many_moves = (False
-                          if self.config.online_moves.chessdb.max_moves is None
-                          else self.chessdb_counter >= self.config.online_moves.chessdb.max_moves)
+        max_moves = self.config.online_moves.chessdb.max_moves
+        too_many_moves = False if max_moves is None else self.move_counters[self._make_chessdb_move] >= max_moves
         has_time = self._has_time(self.config.online_moves.chessdb.min_time)
         is_endgame = chess.popcount(self.board.occupied) <= 7
 
@@ -493,7 +555,7 @@ class Lichess_Game:
         response = await self.api.get_chessdb_eval(self.board.fen(), self.config.online_moves.chessdb.timeout)
         if response is None:
             self.out_of_chessdb_counter += 1
-            self._reduce_own_time(time.perf_counter() - start_time)
+            self._charge_lookup_time(start_time)
             return
 
         if response['status'] != 'ok':
@@ -522,28 +584,29 @@ class Lichess_Game:
         else:
             return
 
-        self.chessdb_counter += 1
         pov_score = chess.engine.PovScore(chess.engine.Cp(chessdb_move['score']), self.board.turn)
         candidates = (f'Candidates: {", ".join(chessdb_move["san"] for chessdb_move in candidate_moves)}'
                       if len(candidate_moves) > 1 else '')
-        message = f'ChessDB: {self._format_move(move):14} {self._format_score(pov_score)}     {candidates}'
-        return Move_Response(move, message)
-
-    def _probe_gaviota(self, moves: Iterable[chess.Move]) -> Gaviota_Result:
-        assert self.gaviota_tablebase
+        return Move_Response(move,
+                             lambda board: (f'ChessDB: {self._format_move(board, move):14} '
+                                            f'{self._format_score(board, pov_score)}     {candidates}'))
 
+    def _probe_gaviota(self, board: chess.Board, moves: list[chess.Move]) -> Gaviota_Result | None:
         best_move = chess.Move.null()
         best_wdl = -2
         best_dtm = 1_000_000
-        board_copy = self.board.copy(stack=False)
         for move in moves:
-            board_copy.push(move)
+            board.push(move)
 
-            if board_copy.is_checkmate():
+            if board.is_checkmate():
                 return Gaviota_Result(move, 2, 0)
 
-            dtm = -self.gaviota_tablebase.probe_dtm(board_copy)
-            wdl = self._value_to_wdl(dtm, board_copy.halfmove_clock)
+            dtm = self.tablebase_service.probe_gaviota_dtm(board)
+            if dtm is None:
+                return
+
+            dtm = -dtm
+            wdl = self._value_to_wdl(dtm, board.halfmove_clock)
 
             if best_move:
                 if wdl > best_wdl:
@@ -558,7 +621,7 @@ class Lichess_Game:
                 best_wdl = wdl
                 best_dtm = dtm
 
-            board_copy.pop()
+            board.pop()
 
         return Gaviota_Result(best_move, best_wdl, best_dtm)
 
@@ -570,17 +633,16 @@ class Lichess_Game:
                 if self._has_mate_score():
                     return
 
-                try:
-                    result = self._probe_gaviota(self.board.generate_legal_captures())
-                except KeyError:
-                    return
-
-                if result.wdl < 2:
+                result = await self.tablebase_service.run_gaviota_probe(self._probe_gaviota,
+                                                                        self.board.copy(stack=False),
+                                                                        list(self.board.generate_legal_captures()))
+                if result is None or result.wdl < 2:
                     return
             case _:
-                try:
-                    result = self._probe_gaviota(self.board.generate_legal_moves())
-                except KeyError:
+                result = await self.tablebase_service.run_gaviota_probe(self._probe_gaviota,
+                                                                        self.board.copy(stack=False),
+                                                                        list(self.board.generate_legal_moves()))
+                if result is None:
                     return
 
         match result.wdl:
@@ -600,66 +662,95 @@ class Lichess_Game:
                 return
 
         await self.engine.stop_pondering(self.board)
-        message = f'Gaviota: {self._format_move(result.move):14} {egtb_info}'
-        return Move_Response(result.move, message, is_drawish=offer_draw, is_resignable=resign)
+        return Move_Response(result.move, self._get_message_formatter('Gaviota:', result.move, egtb_info),
+                             is_drawish=offer_draw, is_resignable=resign)
 
-    def _probe_syzygy(self, moves: Iterable[chess.Move]) -> Syzygy_Result:
-        assert self.syzygy_tablebase
+    def _probe_syzygy(self, board: chess.Board, moves: list[chess.Move]) -> Syzygy_Result | None:
+        moves_by_wdl: defaultdict[int, list[chess.Move]] = defaultdict(list)
+        for move in moves:
+            board.push(move)
+            wdl = self._probe_syzygy_wdl(board)
+            board.pop()
+
+            if wdl is None:
+                return
+
+            moves_by_wdl[-wdl].append(move)
 
         best_move = chess.Move.null()
         best_wdl = -2
         best_dtz = 1_000_000
         best_real_dtz = 0
-        board_copy = self.board.copy(stack=False)
-        for move in moves:
-            board_copy.push(move)
+        for coarse_wdl in sorted(moves_by_wdl, reverse=True):
+            if best_move and max(coarse_wdl, -1) < best_wdl:
+                break
 
-            dtz = -self.syzygy_tablebase.probe_dtz(board_copy)
-            wdl = self._value_to_wdl(dtz, board_copy.halfmove_clock)
+            for move in moves_by_wdl[coarse_wdl]:
+                board.push(move)
 
-            real_dtz = dtz
-            if board_copy.halfmove_clock == 0:
-                if wdl < 0:
-                    dtz += 10_000
-                elif wdl > 0:
-                    dtz -= 10_000
+                dtz = self._probe_syzygy_dtz(board)
+                if dtz is None:
+                    return
 
-            if best_move:
-                if wdl > best_wdl:
+                dtz = -dtz
+                wdl = self._value_to_wdl(dtz, board.halfmove_clock)
+
+                real_dtz = dtz
+                if board.halfmove_clock == 0:
+                    if wdl < 0:
+                        dtz += 10_000
+                    elif wdl > 0:
+                        dtz -= 10_000
+
+                if best_move:
+                    if wdl > best_wdl:
+                        best_move = move
+                        best_wdl = wdl
+                        best_dtz = dtz
+                        best_real_dtz = real_dtz
+                    elif wdl == best_wdl and dtz < best_dtz:
+                        best_move = move
+                        best_dtz = dtz
+                        best_real_dtz = real_dtz
+                else:
                     best_move = move
                     best_wdl = wdl
                     best_dtz = dtz
                     best_real_dtz = real_dtz
-                elif wdl == best_wdl and dtz < best_dtz:
-                    best_move = move
-                    best_dtz = dtz
-                    best_real_dtz = real_dtz
-            else:
-                best_move = move
-                best_wdl = wdl
-                best_dtz = dtz
-                best_real_dtz = real_dtz
 
-            board_copy.pop()
+                board.pop()
 
         return Syzygy_Result(best_move, best_wdl, best_real_dtz)
 
+    def _probe_syzygy_wdl(self, board: chess.Board) -> int | None:
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in self.syzygy_wdls:
+            self.syzygy_wdls[key] = self.tablebase_service.probe_syzygy_wdl(board)
+
+        return self.syzygy_wdls[key]
+
+    def _probe_syzygy_dtz(self, board: chess.Board) -> int | None:
+        key = chess.polyglot.zobrist_hash(board)
+        if key not in self.syzygy_dtzs:
+            self.syzygy_dtzs[key] = self.tablebase_service.probe_syzygy_dtz(board)
+
+        return self.syzygy_dtzs[key]
+
     async def _make_syzygy_move(self) -> Move_Response | None:
         match chess.popcount(self.board.occupied):
             case pieces if pieces > self.syzygy_config.max_pieces + 1 or self._has_mate_score():
                 return
             case pieces if pieces == self.syzygy_config.max_pieces + 1:
-                try:
-                    result = self._probe_syzygy(self.board.generate_legal_captures())
-                except KeyError:
-                    return
-
-                if result.wdl < 2:
+                result = await self.tablebase_service.run_syzygy_probe(self._probe_syzygy,
+                                                                       self.board.copy(stack=False),
+                                                                       list(self.board.generate_legal_captures()))
+                if result is None or result.wdl < 2:
                     return
             case _:
-                try:
-                    result = self._probe_syzygy(self.board.generate_legal_moves())
-                except KeyError:
+                result = await self.tablebase_service.run_syzygy_probe(self._probe_syzygy,
+                                                                       self.board.copy(stack=False),
+                                                                       list(self.board.generate_legal_moves()))
+                if result is None:
                     return
 
         match result.wdl:
@@ -685,8 +776,8 @@ class Lichess_Game:
                 resign = True
 
         await self.engine.stop_pondering(self.board)
-        message = f'Syzygy:  {self._format_move(result.move):14} {egtb_info}'
-        return Move_Response(result.move, message, is_drawish=offer_draw, is_resignable=resign)
+        return Move_Response(result.move, self._get_message_formatter('Syzygy: ', result.move, egtb_info),
+                             is_drawish=offer_draw, is_resignable=resign)
 
     def _value_to_wdl(self, value: int, halfmove_clock: int) -> Literal[-2, -1, 0, 1, 2]:
         if value > 0:
@@ -703,28 +794,6 @@ class Lichess_Game:
 
         return 0
 
-    def _get_syzygy_tablebase(self) -> chess.syzygy.Tablebase | None:
-        if not (self.syzygy_config.enabled and self.syzygy_config.instant_play):
-            return
-
-        tablebase = chess.syzygy.open_tablebase(self.syzygy_config.paths[0], VariantBoard=type(self.board))
-
-        for path in self.syzygy_config.paths[1:]:
-            tablebase.add_directory(path)
-
-        return tablebase
-
-    def _get_gaviota_tablebase(self) -> chess.gaviota.PythonTablebase | chess.gaviota.NativeTablebase | None:
-        if not self.config.gaviota.enabled:
-            return
-
-        tablebase = chess.gaviota.open_tablebase(self.config.gaviota.paths[0])
-
-        for path in self.config.gaviota.paths[1:]:
-            tablebase.add_directory(path)
-
-        return tablebase
-
     async def _make_egtb_move(self) -> Move_Response | None:
         max_pieces = 7 if self.board.uci_variant == 'chess' else 6
         match chess.popcount(self.board.occupied):
@@ -743,7 +812,7 @@ class Lichess_Game:
         start_time = time.perf_counter()
         response = await self.api.get_egtb(self.board.fen(), variant, self.config.online_moves.online_egtb.timeout)
         if response is None:
-            self._reduce_own_time(time.perf_counter() - start_time)
+            self._charge_lookup_time(start_time)
             return
 
         outcome: str = response['category']
@@ -756,20 +825,28 @@ class Lichess_Game:
         offer_draw = outcome in ['draw', 'blessed loss']
         resign = outcome == 'loss'
         move = chess.Move.from_uci(uci_move)
-        message = f'EGTB:    {self._format_move(move):14} {self._format_egtb_info(outcome, dtz, dtm)}'
-        return Move_Response(move, message, is_drawish=offer_draw, is_resignable=resign)
+        egtb_info = self._format_egtb_info(outcome, dtz, dtm)
+        return Move_Response(move, self._get_message_formatter('EGTB:   ', move, egtb_info),
+                             is_drawish=offer_draw, is_resignable=resign)
+
+    def _get_message_formatter(self, source: str, move: chess.Move, info: str = '') -> Callable[[chess.Board], str]:
+        def format_message(board: chess.Board) -> str:
+            message = f'{source} {self._format_move(board, move):14}'
+            return f'{message} {info}' if info else message
 
-    def _format_move(self, move: chess.Move) -> str:
-        if self.board.turn:
-            move_number = f'{self.board.fullmove_number}.'
-            return f'{move_number:4} {self.board.san(move)}'
+        return format_message
 
-        move_number = f'{self.board.fullmove_number}...'
-        return f'{move_number:6} {self.board.san(move)}'
+    def _format_move(self, board: chess.Board, move: chess.Move) -> str:
+        if board.turn:
+            move_number = f'{board.fullmove_number}.'
+            return f'{move_number:4} {board.san(move)}'
 
-    def _format_engine_info(self, info: chess.engine.InfoDict) -> str:
+        move_number = f'{board.fullmove_number}...'
+        return f'{move_number:6} {board.san(move)}'
+
+    def _format_engine_info(self, board: chess.Board, info: chess.engine.InfoDict) -> str:
         info_score = info.get('score')
-        score = f'{self._format_score(info_score):7}' if info_score else 7 * ' '
+        score = f'{self._format_score(board, info_score):7}' if info_score else 7 * ' '
 
         info_depth = info.get('depth')
         info_seldepth = info.get('seldepth')
@@ -812,15 +889,15 @@ class Lichess_Game:
 
         return f'{number:5}  '
 
-    def _format_score(self, score: chess.engine.PovScore) -> str:
+    def _format_score(self, board: chess.Board, score: chess.engine.PovScore) -> str:
         if not score.is_mate():
-            if cp_score := score.pov(self.board.turn).score():
+            if cp_score := score.pov(board.turn).score():
                 cp_score /= 100
                 return format(cp_score, '+7.2f')
 
             return '   0.00'
 
-        return str(score.pov(self.board.turn))
+        return str(score.pov(board.turn))
 
     def _format_egtb_info(self, outcome: str, dtz: int | None = None, dtm: int | None = None) -> str:
         outcome_str = f'{outcome:>7}'
@@ -881,12 +958,6 @@ class Lichess_Game:
 
         return move_sources
 
-    def _get_move_overhead(self, engine_config: Engine_Config) -> float:
-        move_overhead_multiplier = (1.0
-                                    if engine_config.move_overhead_multiplier is None
-                                    else engine_config.move_overhead_multiplier)
-        return max(self.game_info.initial_time_ms / 60_000 * move_overhead_multiplier, 1.0)
-
     def _has_time(self, min_time: float) -> bool:
         if len(self.board.move_stack) < 2:
             return True
@@ -896,6 +967,12 @@ class Lichess_Game:
 
         return self.own_time >= min_time
 
+    def _charge_lookup_time(self, start_time: float) -> None:
+        if self.config.online_moves.concurrent_lookups:
+            return
+
+        self._reduce_own_time(time.perf_counter() - start_time)
+
     def _reduce_own_time(self, seconds: float) -> None:
         if len(self.board.move_stack) < 2:
             return
@@ -906,9 +983,7 @@ class Lichess_Game:
             self.black_time -= seconds
 
     def _is_repetition(self, move: chess.Move) -> bool:
-        board = self.board.copy()
-        board.push(move)
-        return board.is_repetition(count=2)
+        return self.position_history.is_repetition_after(move)
 
     def _has_mate_score(self) -> bool:
         if not self.scores:
@@ -1,11 +1,12 @@
 import random
 from datetime import datetime, timedelta
+from typing import Any
 
 from api import API
-from botli_dataclasses import Bot, Challenge_Request, Challenge_Response, Matchmaking_Type
+from botli_dataclasses import Bot, Challenge_Request, Challenge_Response, Matchmaking_Game, Matchmaking_Type
 from challenger import Challenger
 from config import Config
-from enums import Busy_Reason, Perf_Type, Variant
+from enums import Busy_Reason, Challenge_Color, Perf_Type, Variant
 from exceptions import NoOpponentException
 from opponents import Opponents
 
@@ -22,8 +23,8 @@ class Matchmaking:
         self.opponents = Opponents(config.matchmaking.delay, username)
         self.challenger = Challenger(api)
 
-        self.game_start_time: datetime = datetime.now()
-        self.online_bots: list[Bot] = []
+        self.games: dict[str, Matchmaking_Game] = {}
+        self.bot_statuses: dict[str, tuple[datetime, dict[str, Any]]] = {}
         self.current_type: Matchmaking_Type | None = None
 
     async def create_challenge(self) -> Challenge_Response | None:
@@ -39,7 +40,7 @@ class Matchmaking:
             print(f'Matchmaking type: {self.current_type}')
 
         try:
-            next_opponent = self.opponents.get_opponent(self.online_bots, self.current_type)
+            opponents = self.opponents.get_opponents(self.current_type)
         except NoOpponentException:
             print(f'Suspending matchmaking type {self.current_type.name} because no suitable opponent is available.')
             self.suspended_types.append(self.current_type)
@@ -51,7 +52,7 @@ class Matchmaking:
 
             return Challenge_Response(no_opponent=True)
 
-        if next_opponent is None:
+        if not opponents:
             print(f'No opponent available for matchmaking type {self.current_type.name}.')
             if self.config.matchmaking.selection == 'weighted_random':
                 self.current_type = None
@@ -63,20 +64,10 @@ class Matchmaking:
 
             return
 
-        opponent, color = next_opponent
-
-        match await self._get_busy_reason(opponent):
-            case Busy_Reason.PLAYING:
-                rating_diff = opponent.rating_diffs[self.current_type.perf_type]
-                print(f'Skipping {opponent.username} ({rating_diff:+}) as {color} ...')
-                self.opponents.busy_bots.append(opponent)
-                return
-
-            case Busy_Reason.OFFLINE:
-                print(f'Removing {opponent.username} from online bots ...')
-                self.online_bots.remove(opponent)
-                return
+        if (next_opponent := await self._get_available_opponent(opponents)) is None:
+            return
 
+        opponent, color = next_opponent
         rating_diff = opponent.rating_diffs[self.current_type.perf_type]
         print(f'Challenging {opponent.username} ({rating_diff:+}) as {color} to {self.current_type.name} ...')
         challenge_request = Challenge_Request(opponent.username, self.current_type.initial_time,
@@ -84,28 +75,35 @@ class Matchmaking:
                                               self.current_type.variant, self.timeout)
 
         response = await self.challenger.create(challenge_request)
-        if response.success:
-            self.game_start_time = datetime.now()
+        if response.success and response.challenge_id:
+            self.games[response.challenge_id] = Matchmaking_Game(opponent.username, color,
+                                                                 self.current_type, datetime.now())
+
+            if self.config.matchmaking.selection == 'cyclic':
+                self.current_type = self._get_next_type()
+            else:
+                self.current_type = None
         elif not (response.has_reached_rate_limit or response.is_misconfigured):
-            self.opponents.add_timeout(False, self.current_type.estimated_game_duration)
+            self.opponents.add_timeout(opponent.username, color, self.current_type, False,
+                                       self.current_type.estimated_game_duration)
         else:
             self.current_type = None
 
         return response
 
-    def on_game_finished(self, was_aborted: bool) -> None:
-        assert self.current_type
+    def on_game_finished(self, game_id: str, was_aborted: bool) -> None:
+        if not (game := self.games.pop(game_id, None)):
+            return
 
-        game_duration = datetime.now() - self.game_start_time
+        game_duration = datetime.now() - game.start_time
         if was_aborted:
-            game_duration += self.current_type.estimated_game_duration
+            game_duration += game.matchmaking_type.estimated_game_duration
 
-        self.opponents.add_timeout(not was_aborted, game_duration)
+        self.opponents.add_timeout(game.opponent_username, game.color, game.matchmaking_type,
+                                   not was_aborted, game_duration)
 
-        if self.config.matchmaking.selection == 'cyclic':
-            self.current_type = self._get_next_type()
-        else:
-            self.current_type = None
+    def close(self) -> None:
+        self.opponents.close()
 
     def _get_next_type(self) -> Matchmaking_Type | None:
         last_type = self.types[-1]
@@ -147,7 +145,8 @@ class Matchmaking:
         print('Updating online bots and rankings ...')
         self.types.extend(self.suspended_types)
         self.suspended_types.clear()
-        self.online_bots = await self._get_online_bots()
+        self.opponents.set_online_bots(await self._get_online_bots())
+        self.bot_statuses.clear()
         self._set_multiplier()
         return True
 
@@ -155,12 +154,13 @@ class Matchmaking:
         user_ratings = await self._get_user_ratings()
 
         online_bots: list[Bot] = []
+        blacklist = set(self.config.blacklist)
         blacklisted_bot_count = 0
         for bot in await self.api.get_online_bots():
             if bot['username'] == self.username:
                 continue
 
-            if bot['id'] in self.config.blacklist:
+            if bot['id'] in blacklist:
                 blacklisted_bot_count += 1
                 continue
 
@@ -204,22 +204,8 @@ class Matchmaking:
                 matchmaking_type.multiplier = bot_count * perf_type_count
 
     def _get_bot_count(self, perf_type: Perf_Type, min_rating_diff: int, max_rating_diff: int) -> int:
-        def bot_filter(bot: Bot) -> bool:
-            if perf_type not in bot.rating_diffs:
-                return False
-
-            if abs(bot.rating_diffs[perf_type]) > max_rating_diff:
-                return False
-
-            if abs(bot.rating_diffs[perf_type]) < min_rating_diff:
-                return False
-
-            if self.opponents.opponent_dict[bot.username][perf_type].multiplier > 1:
-                return False
-
-            return True
-
-        return sum(map(bot_filter, self.online_bots))
+        return sum(self.opponents.get_multiplier(bot.username, perf_type) == 1
+                   for bot in self.opponents.get_bots(perf_type, min_rating_diff, max_rating_diff))
 
     def _variant_to_perf_type(self, variant: Variant, initial_time: int, increment: int) -> Perf_Type:
         if variant != Variant.STANDARD:
@@ -243,8 +229,42 @@ class Matchmaking:
 
         return Variant(perf_type)
 
-    async def _get_busy_reason(self, bot: Bot) -> Busy_Reason | None:
-        bot_status = await self.api.get_user_status(bot.username)
+    async def _get_available_opponent(self,
+                                      opponents: list[tuple[Bot, Challenge_Color]]
+                                      ) -> tuple[Bot, Challenge_Color] | None:
+        assert self.current_type
+
+        current_opponents = {game.opponent_username for game in self.games.values()}
+        opponents = [(bot, color) for bot, color in opponents if bot.username not in current_opponents][:100]
+        await self._update_bot_statuses([bot for bot, _ in opponents])
+
+        for bot, color in opponents:
+            match self._get_busy_reason(bot):
+                case Busy_Reason.PLAYING:
+                    rating_diff = bot.rating_diffs[self.current_type.perf_type]
+                    print(f'Skipping {bot.username} ({rating_diff:+}) as {color} ...')
+                    self.opponents.busy_bots.add(bot.username)
+                case Busy_Reason.OFFLINE:
+                    print(f'Removing {bot.username} from online bots ...')
+                    self.opponents.remove_bot(bot)
+                case None:
+                    return bot, color
+
+    async def _update_bot_statuses(self, bots: list[Bot]) -> None:
+        now = datetime.now()
+        usernames = [bot.username for bot in bots
+                     if bot.username.lower() not in self.bot_statuses
+                     or self.bot_statuses[bot.username.lower()][0] < now]
+        if not usernames:
+            return
+
+        bot_statuses = {bot_status['id']: bot_status for bot_status in await self.api.get_users_status(usernames)}
+        expiration_time = now + timedelta(seconds=30.0)
+        for username in usernames:
+            self.bot_statuses[username.lower()] = (expiration_time, bot_statuses.get(username.lower(), {}))
+
+    def _get_busy_reason(self, bot: Bot) -> Busy_Reason | None:
+        bot_status = self.bot_statuses[bot.username.lower()][1]
         if 'online' not in bot_status:
             return Busy_Reason.OFFLINE
 
@@ -0,0 +1,113 @@
+import asyncio
+import json
+import sqlite3
+import threading
+from datetime import datetime
+from typing import Any
+
+from enums import Perf_Type
+
+FLUSH_DELAY = 5.0
+COMPACTION_INTERVAL = 50
+
+
+class Matchmaking_Store:
+    def __init__(self, path: str) -> None:
+        self.path = path
+        self.connection: sqlite3.Connection | None = None
+        self.lock = threading.Lock()
+        self.pending_updates: dict[tuple[str, Perf_Type], dict[str, Any]] = {}
+        self.flush_task: asyncio.Task[None] | None = None
+        self.flushes_since_compaction = 0
+
+    def load(self) -> dict[tuple[str, Perf_Type], dict[str, Any]]:
+        self.connection = self._open()
+        if not self.connection:
+            return {}
+
+        return {(username, Perf_Type(perf_type)): json.loads(data)
+                for username, perf_type, data
+                in self.connection.execute('SELECT username, perf_type, data FROM opponents')}
+
+    @property
+    def is_open(self) -> bool:
+        return self.connection is not None
+
+    def update(self, username: str, perf_type: Perf_Type, data: dict[str, Any]) -> None:
+        if not self.connection:
+            return
+
+        self.pending_updates[(username, perf_type)] = data
+
+        if not self.flush_task:
+            self.flush_task = asyncio.create_task(self._flush_task())
+
+    def flush(self) -> None:
+        self._write(self._take_pending_updates())
+
+    def close(self) -> None:
+        if self.flush_task:
+            self.flush_task.cancel()
+            self.flush_task = None
+
+        if not self.connection:
+            return
+
+        self.flush()
+        with self.lock:
+            self.connection.close()
+            self.connection = None
+
+    async def _flush_task(self) -> None:
+        await asyncio.sleep(FLUSH_DELAY)
+        self.flush_task = None
+        await asyncio.to_thread(self._write, self._take_pending_updates())
+
+    def _take_pending_updates(self) -> dict[tuple[str, Perf_Type], dict[str, Any]]:
+        pending_updates = self.pending_updates
+        self.pending_updates = {}
+        return pending_updates
+
+    def _write(self, updates: dict[tuple[str, Perf_Type], dict[str, Any]]) -> None:
+        with self.lock:
+            if not self.connection or not updates:
+                return
+
+            try:
+                with self.connection:
+                    self.connection.executemany('DELETE FROM opponents WHERE username = ? AND perf_type = ?',
+                                                [key for key, data in updates.items() if not data])
+                    self.connection.executemany('INSERT OR REPLACE INTO opponents VALUES (?, ?, ?)',
+                                                [(username, perf_type, json.dumps(data))
+                                                 for (username, perf_type), data in updates.items() if data])
+
+                self.flushes_since_compaction += 1
+                if self.flushes_since_compaction >= COMPACTION_INTERVAL:
+                    self._compact()
+            except sqlite3.Error as e:
+                print(f'Saving matchmaking data to "{self.path}" failed: {e}')
+
+    def _compact(self) -> None:
+        assert self.connection
+
+        self.flushes_since_compaction = 0
+        with self.connection:
+            self.connection.execute(('DELETE FROM opponents WHERE json_extract(data, \'$.multiplier\') IS NULL '
+                                     'AND json_extract(data, \'$.color\') IS NULL '
+                                     'AND IFNULL(json_extract(data, \'$.release_time\'), \'\') < ?'),
+                                    (datetime.now().isoformat(timespec='seconds'),))
+        self.connection.execute('PRAGMA wal_checkpoint(TRUNCATE)')
+
+    def _open(self) -> sqlite3.Connection | None:
+        try:
+            connection = sqlite3.connect(self.path, check_same_thread=False)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS opponents (username TEXT, perf_type TEXT, data TEXT, '
+                               'PRIMARY KEY (username, perf_type))')
+        except sqlite3.Error as e:
+            print(f'Matchmaking database "{self.path}" could not be opened, '
+                  f'matchmaking data of this session will not be saved: {e}')
+            return
+
+        return connection
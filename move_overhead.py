@@ -0,0 +1,52 @@
+from collections import defaultdict
+
+from botli_dataclasses import Game_Information
+from configs import Engine_Config
+
+MIN_SAMPLES = 3
+MEAN_GAIN = 0.125
+DEVIATION_GAIN = 0.25
+MAX_SAMPLE = 10.0
+MIN_MOVE_OVERHEAD = 0.05
+
+
+class Move_Overhead_Tracker:
+    def __init__(self) -> None:
+        self.samples: defaultdict[str, int] = defaultdict(int)
+        self.means: dict[str, float] = {}
+        self.deviations: dict[str, float] = {}
+        self.round_trip = 0.0
+
+    def get_move_overhead(self, game_info: Game_Information, engine_config: Engine_Config) -> float:
+        move_overhead_multiplier = (1.0
+                                    if engine_config.move_overhead_multiplier is None
+                                    else engine_config.move_overhead_multiplier)
+
+        if self.samples[game_info.tc_str] < MIN_SAMPLES:
+            return max(game_info.initial_time_ms / 60_000 * move_overhead_multiplier, 1.0)
+
+        return self._get_calibrated_move_overhead(game_info.tc_str) * move_overhead_multiplier
+
+    def add_sample(self, game_info: Game_Information, expected_time: float, actual_time_ms: int) -> None:
+        key = game_info.tc_str
+        overhead = min(max(expected_time - actual_time_ms / 1000, 0.0), MAX_SAMPLE)
+
+        if self.samples[key]:
+            self.deviations[key] += DEVIATION_GAIN * (abs(overhead - self.means[key]) - self.deviations[key])
+            self.means[key] += MEAN_GAIN * (overhead - self.means[key])
+        else:
+            self.means[key] = overhead
+            self.deviations[key] = overhead / 2
+
+        self.samples[key] += 1
+        if self.samples[key] == MIN_SAMPLES:
+            print(f'Move overhead for {key} calibrated to {self._get_calibrated_move_overhead(key) * 1000:.0f} ms.')
+
+    def add_round_trip(self, latency: float) -> None:
+        if self.round_trip:
+            self.round_trip += MEAN_GAIN * (latency - self.round_trip)
+        else:
+            self.round_trip = latency
+
+    def _get_calibrated_move_overhead(self, key: str) -> float:
+        return max(self.means[key] + 4 * self.deviations[key], self.round_trip, MIN_MOVE_OVERHEAD)
@@ -0,0 +1,87 @@
+import asyncio
+from asyncio import Task
+from collections.abc import Awaitable, Callable
+
+import aiohttp
+import chess
+import chess.engine
+
+from botli_dataclasses import Move_Response
+from engine import Engine
+from engine_pool import Engine_Pool
+
+ABORTABLE_TIMEOUT = 20.0
+MIN_TIMEOUT = 0.1
+SAFETY_FRACTION = 0.1
+MIN_BOOK_TIME = 1.0
+MOVE_ERRORS = (TimeoutError, chess.engine.EngineError, aiohttp.ClientError, OSError)
+
+
+class Move_Watchdog:
+    def __init__(self, engine_pool: Engine_Pool) -> None:
+        self.engine_pool = engine_pool
+        self.fired_counter = 0
+        self.timeout = 0.0
+        self.safety_margin = 0.0
+        self.restart_task: Task[Engine] | None = None
+
+    def get_timeout(self, is_abortable: bool, own_time: float, engine_time: float) -> float:
+        if is_abortable:
+            self.safety_margin = ABORTABLE_TIMEOUT
+            self.timeout = ABORTABLE_TIMEOUT
+            return self.timeout
+
+        self.safety_margin = max(2 * (own_time - engine_time), own_time * SAFETY_FRACTION)
+        self.timeout = max(own_time - self.safety_margin, MIN_TIMEOUT)
+        return self.timeout
+
+    async def fire(self,
+                   board: chess.Board,
+                   engine: Engine,
+                   last_pv: list[chess.Move],
+                   make_book_move: Callable[[], Awaitable[Move_Response | None]],
+                   error: Exception,
+                   is_engine_error: bool) -> chess.Move:
+        self.fired_counter += 1
+        reason = f'No move after {self.timeout:.1f} seconds' if isinstance(error, TimeoutError) else repr(error)
+        print(f'Watchdog: {reason}, playing fallback move ({self.fired_counter} time(s) this game).')
+
+        if is_engine_error and not self.restart_task:
+            engine.ponder = False
+            self.restart_task = asyncio.create_task(self._restart(engine))
+
+        if move := self._get_pv_move(board, engine, last_pv):
+            return move
+
+        if self.safety_margin >= MIN_BOOK_TIME and (book_response := await make_book_move()):
+            return book_response.move
+
+        return max(board.legal_moves, key=lambda move: board.piece_type_at(move.to_square) or 0)
+
+    async def get_engine(self, engine: Engine) -> Engine:
+        if not self.restart_task:
+            return engine
+
+        engine = await asyncio.shield(self.restart_task)
+        self.restart_task = None
+        return engine
+
+    def _get_pv_move(self, board: chess.Board, engine: Engine, last_pv: list[chess.Move]) -> chess.Move | None:
+        if not board.move_stack:
+            return
+
+        pvs = [last_pv[1:]]
+        if engine.ponder_analysis:
+            pvs.insert(0, engine.ponder_analysis.info.get('pv', []))
+
+        for pv in pvs:
+            if len(pv) > 1 and pv[0] == board.peek() and board.is_legal(pv[1]):
+                return pv[1]
+
+    async def _restart(self, engine: Engine) -> Engine:
+        print('Engine failed to move and will be restarted.')
+        try:
+            return await self.engine_pool.restart(engine)
+        except (OSError, chess.engine.EngineError) as e:
+            print(f'Engine could not be restarted: {e}')
+            return engine
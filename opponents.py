@@ -1,39 +1,93 @@
 import json
 import os
-from collections import defaultdict
+from bisect import bisect_left, bisect_right
+from collections.abc import Callable
 from datetime import datetime, timedelta
 from typing import Any
 
 from botli_dataclasses import Bot, Matchmaking_Data, Matchmaking_Type
 from enums import Challenge_Color, Perf_Type
 from exceptions import NoOpponentException
+from matchmaking_store import Matchmaking_Store
 
 
 class Opponents:
     def __init__(self, delay: int, username: str) -> None:
         self.delay = timedelta(seconds=delay)
         self.matchmaking_file = f'{username}_matchmaking.json'
-        self.opponent_dict = self._load(self.matchmaking_file)
-        self.busy_bots: list[Bot] = []
-        self.last_opponent: tuple[str, Challenge_Color, Matchmaking_Type]
-
-    def get_opponent(self,
-                     online_bots: list[Bot],
-                     matchmaking_type: Matchmaking_Type) -> tuple[Bot, Challenge_Color] | None:
-        for bot in self._filter_bots(online_bots, matchmaking_type):
-            if bot in self.busy_bots:
+        self.store = Matchmaking_Store(f'{username}_matchmaking.db')
+        self.loaded_opponent_data: dict[tuple[str, Perf_Type], Matchmaking_Data] | None = None
+        self.busy_bots: set[str] = set()
+        self.bot_index: dict[Perf_Type, list[Bot]] = {}
+
+    @property
+    def opponent_data(self) -> dict[tuple[str, Perf_Type], Matchmaking_Data]:
+        if self.loaded_opponent_data is None:
+            self.loaded_opponent_data = self._load()
+
+        return self.loaded_opponent_data
+
+    def set_online_bots(self, online_bots: list[Bot]) -> None:
+        self.bot_index = {perf_type: sorted((bot for bot in online_bots if perf_type in bot.rating_diffs),
+                                            key=self._get_sort_key(perf_type))
+                          for perf_type in Perf_Type}
+        self.busy_bots.clear()
+        self._expire_stale_entries(self.opponent_data)
+
+    def remove_bot(self, bot: Bot) -> None:
+        for perf_type, bots in self.bot_index.items():
+            if perf_type not in bot.rating_diffs:
                 continue
 
-            data = self.opponent_dict[bot.username][matchmaking_type.perf_type]
-            if data.color == Challenge_Color.BLACK or data.release_time <= datetime.now():
-                self.last_opponent = (bot.username, data.color, matchmaking_type)
-                return bot, data.color
+            sort_key = self._get_sort_key(perf_type)
+            start = bisect_left(bots, sort_key(bot), key=sort_key)
+            end = bisect_right(bots, sort_key(bot), key=sort_key)
+            for index in range(start, end):
+                if bots[index] == bot:
+                    del bots[index]
+                    break
+
+    def get_bots(self, perf_type: Perf_Type, min_rating_diff: int | None, max_rating_diff: int | None) -> list[Bot]:
+        bots = self.bot_index.get(perf_type, [])
+        sort_key = self._get_sort_key(perf_type)
+        start = bisect_left(bots, min_rating_diff, key=sort_key) if min_rating_diff else 0
+        end = bisect_right(bots, max_rating_diff, key=sort_key) if max_rating_diff else len(bots)
+        return bots[start:end]
+
+    def get_opponents(self, matchmaking_type: Matchmaking_Type) -> list[tuple[Bot, Challenge_Color]]:
+        bots = self.get_bots(matchmaking_type.perf_type,
+                             matchmaking_type.min_rating_diff,
+                             matchmaking_type.max_rating_diff)
+        if not bots:
+            raise NoOpponentException
 
-        self.busy_bots.clear()
+        opponents: list[tuple[Bot, Challenge_Color]] = []
+        for bot in bots:
+            if bot.username in self.busy_bots:
+                continue
+
+            data = self.opponent_data.get((bot.username, matchmaking_type.perf_type))
+            if data is None:
+                opponents.append((bot, Challenge_Color.WHITE))
+            elif data.color == Challenge_Color.BLACK or data.release_time <= datetime.now():
+                opponents.append((bot, data.color))
+
+        if not opponents:
+            self.busy_bots.clear()
+
+        return opponents
 
-    def add_timeout(self, success: bool, game_duration: timedelta) -> None:
-        username, color, matchmaking_type = self.last_opponent
-        data = self.opponent_dict[username][matchmaking_type.perf_type]
+    def get_multiplier(self, username: str, perf_type: Perf_Type) -> int:
+        data = self.opponent_data.get((username, perf_type))
+        return data.multiplier if data else 1
+
+    def add_timeout(self,
+                    username: str,
+                    color: Challenge_Color,
+                    matchmaking_type: Matchmaking_Type,
+                    success: bool,
+                    game_duration: timedelta) -> None:
+        data = self.opponent_data.setdefault((username, matchmaking_type.perf_type), Matchmaking_Data(datetime.now()))
 
         data.multiplier = 1 if success else data.multiplier * 2
         timeout = (game_duration + self.delay) * matchmaking_type.multiplier * data.multiplier
@@ -52,102 +106,71 @@ class Opponents:
             data.color = Challenge_Color.WHITE
 
         self.busy_bots.clear()
-        self._save(self.matchmaking_file)
+        self.store.update(username, matchmaking_type.perf_type, data.to_dict())
 
     def reset_release_time(self, perf_type: Perf_Type) -> None:
-        for perf_types in self.opponent_dict.values():
-            perf_types[perf_type].release_time = datetime.now()
+        for (username, data_perf_type), data in self.opponent_data.items():
+            if data_perf_type == perf_type:
+                data.release_time = datetime.now()
+                self.store.update(username, perf_type, data.to_dict())
 
         self.busy_bots.clear()
 
-    def _filter_bots(self, bots: list[Bot], matchmaking_type: Matchmaking_Type) -> list[Bot]:
-        def bot_filter(bot: Bot) -> bool:
-            if matchmaking_type.perf_type not in bot.rating_diffs:
-                return False
+    def close(self) -> None:
+        self.store.close()
 
-            if matchmaking_type.max_rating_diff:
-                if abs(bot.rating_diffs[matchmaking_type.perf_type]) > matchmaking_type.max_rating_diff:
-                    return False
+    def _get_sort_key(self, perf_type: Perf_Type) -> Callable[[Bot], int]:
+        return lambda bot: abs(bot.rating_diffs[perf_type])
 
-            if matchmaking_type.min_rating_diff:
-                if abs(bot.rating_diffs[matchmaking_type.perf_type]) < matchmaking_type.min_rating_diff:
-                    return False
+    def _load(self) -> dict[tuple[str, Perf_Type], Matchmaking_Data]:
+        opponent_data = {key: Matchmaking_Data.from_dict(matchmaking_dict)
+                         for key, matchmaking_dict in self.store.load().items()}
 
-            return True
+        if os.path.isfile(self.matchmaking_file):
+            if not self.store.is_open:
+                opponent_data = self._load_json(self.matchmaking_file)
+            else:
+                if not opponent_data:
+                    opponent_data = self._load_json(self.matchmaking_file)
+                    for (username, perf_type), data in opponent_data.items():
+                        self.store.update(username, perf_type, data.to_dict())
+                    self.store.flush()
 
-        bots = sorted(filter(bot_filter, bots), key=lambda bot: abs(bot.rating_diffs[matchmaking_type.perf_type]))
-        if not bots:
-            raise NoOpponentException
+                if opponent_data:
+                    self._retire_json(self.matchmaking_file)
 
-        return bots
+        self._expire_stale_entries(opponent_data)
+        return opponent_data
 
-    def _load(self, matchmaking_file: str) -> defaultdict[str, defaultdict[Perf_Type, Matchmaking_Data]]:
-        if not os.path.isfile(matchmaking_file):
-            return defaultdict(lambda: defaultdict(Matchmaking_Data))
-
-        with open(matchmaking_file, encoding='utf-8') as file:
-            try:
+    def _load_json(self, matchmaking_file: str) -> dict[tuple[str, Perf_Type], Matchmaking_Data]:
+        try:
+            with open(matchmaking_file, encoding='utf-8') as file:
                 dict_ = json.load(file)
-                if isinstance(dict_, list):
-                    return self._update_format(dict_)
-
-            except json.JSONDecodeError as e:
-                print(f'Error while processing the file "{matchmaking_file}": {e}')
-                return defaultdict(lambda: defaultdict(Matchmaking_Data))
-
-            except PermissionError:
-                print('Loading the matchmaking file failed due to missing read permissions.')
-                return defaultdict(lambda: defaultdict(Matchmaking_Data))
-
-            return defaultdict(lambda: defaultdict(Matchmaking_Data),
-                               {username:
-                                defaultdict(Matchmaking_Data,
-                                            {Perf_Type(perf_type):
-                                             Matchmaking_Data.from_dict(matchmaking_dict)
-                                             for perf_type,
-                                             matchmaking_dict in perf_types.items()})
-                                for username,
-                                perf_types in dict_.items()})
-
-    def _min_opponent_dict(self) -> dict[str, dict[Perf_Type, dict[str, Any]]]:
-        return {username: user_dict
-                for username, perf_types
-                in self.opponent_dict.items()
-                if (user_dict := {perf_type: matchmaking_dict
-                                  for perf_type, matchmaking_data
-                                  in perf_types.items()
-                                  if (matchmaking_dict := matchmaking_data.to_dict())})}
-
-    def _save(self, matchmaking_file: str) -> None:
-        min_opponent_dict = self._min_opponent_dict()
-        if not min_opponent_dict:
-            return
+        except json.JSONDecodeError as e:
+            print(f'Error while processing the file "{matchmaking_file}": {e}')
+            return {}
+        except PermissionError:
+            print('Loading the matchmaking file failed due to missing read permissions.')
+            return {}
+
+        if isinstance(dict_, list):
+            dict_ = self._update_format(dict_)
 
+        return {(username, Perf_Type(perf_type)): Matchmaking_Data.from_dict(matchmaking_dict)
+                for username, perf_types in dict_.items()
+                for perf_type, matchmaking_dict in perf_types.items()}
+
+    def _retire_json(self, matchmaking_file: str) -> None:
         try:
-            with open(matchmaking_file, 'w', encoding='utf-8') as json_output:
-                json.dump(min_opponent_dict, json_output)
-        except PermissionError:
-            print('Saving the matchmaking file failed due to missing write permissions.')
-
-    def _update_format(self,
-                       list_format: list[dict[str, Any]]
-                       ) -> defaultdict[str, defaultdict[Perf_Type, Matchmaking_Data]]:
-        dict_format: defaultdict[str,
-                                 defaultdict[Perf_Type,
-                                             Matchmaking_Data]] = defaultdict(lambda: defaultdict(Matchmaking_Data))
-        for old_dict in list_format:
-            username = old_dict.pop('username')
-
-            perf_types: defaultdict[Perf_Type, Matchmaking_Data] = defaultdict(Matchmaking_Data)
-            for perf_type, value in old_dict.items():
-                release_time = (datetime.fromisoformat(value['release_time'])
-                                if 'release_time' in value
-                                else datetime.now())
-                multiplier = value.get('multiplier', 1)
-                color = Challenge_Color(value['color']) if 'color' in value else Challenge_Color.WHITE
-
-                perf_types[Perf_Type(perf_type)] = Matchmaking_Data(release_time, multiplier, color)
-
-            dict_format[username] = perf_types
-
-        return dict_format
+            os.replace(matchmaking_file, f'{matchmaking_file}.imported')
+        except OSError as e:
+            print(f'Renaming the imported file "{matchmaking_file}" failed: {e}')
+
+    def _expire_stale_entries(self, opponent_data: dict[tuple[str, Perf_Type], Matchmaking_Data]) -> None:
+        for (username, perf_type), data in list(opponent_data.items()):
+            if not data.to_dict():
+                del opponent_data[(username, perf_type)]
+                self.store.update(username, perf_type, {})
+
+    def _update_format(self, list_format: list[dict[str, Any]]) -> dict[str, dict[str, dict[str, Any]]]:
+        return {old_dict.pop('username'): old_dict for old_dict in list_format}
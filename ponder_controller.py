@@ -0,0 +1,38 @@
+from engine import Engine
+
+
+class Ponder_Controller:
+    def __init__(self, enabled: bool, threads: int) -> None:
+        self.enabled = enabled
+        self.threads = threads
+        self.engines: list[Engine] = []
+
+    def add_engine(self, engine: Engine) -> None:
+        if not self.enabled:
+            return
+
+        self.engines.append(engine)
+        engine.on_state_change = self.update
+        self.update()
+
+    def remove_engine(self, engine: Engine) -> None:
+        if engine not in self.engines:
+            return
+
+        self.engines.remove(engine)
+        engine.on_state_change = None
+        engine.resume()
+        self.update()
+
+    def update(self) -> None:
+        thinking_threads = sum(engine.threads for engine in self.engines if engine.is_thinking)
+        free_threads = self.threads - thinking_threads
+
+        for engine in self.engines:
+            if not engine.is_pondering:
+                engine.resume()
+            elif not thinking_threads or engine.threads <= free_threads:
+                free_threads -= engine.threads
+                engine.resume()
+            else:
+                engine.suspend()
@@ -0,0 +1,63 @@
+from collections import Counter
+
+import chess
+import chess.polyglot
+from chess.variant import CrazyhouseBoard, ThreeCheckBoard
+
+ZOBRIST_ARRAY = chess.polyglot.POLYGLOT_RANDOM_ARRAY
+ZOBRIST_HASHER = chess.polyglot.ZobristHasher(ZOBRIST_ARRAY)
+
+
+class Position_History:
+    def __init__(self, board: chess.Board) -> None:
+        self.board = board
+        self.repetition_counts: Counter[int] = Counter()
+
+        replay_board = board.root()
+        self.zobrist_hash = chess.polyglot.zobrist_hash(replay_board)
+        self.repetition_counts[self._get_repetition_key(replay_board, self.zobrist_hash)] += 1
+        for move in board.move_stack:
+            self.zobrist_hash = self._push(replay_board, self.zobrist_hash, move)
+            self.repetition_counts[self._get_repetition_key(replay_board, self.zobrist_hash)] += 1
+
+    def push(self, move: chess.Move) -> None:
+        self.zobrist_hash = self._push(self.board, self.zobrist_hash, move)
+        self.repetition_counts[self._get_repetition_key(self.board, self.zobrist_hash)] += 1
+
+    def is_repetition(self, count: int = 3) -> bool:
+        return self.repetition_counts[self._get_repetition_key(self.board, self.zobrist_hash)] >= count
+
+    def is_repetition_after(self, move: chess.Move, count: int = 2) -> bool:
+        zobrist_hash = self._push(self.board, self.zobrist_hash, move)
+        repetition_key = self._get_repetition_key(self.board, zobrist_hash)
+        self.board.pop()
+        return self.repetition_counts[repetition_key] + 1 >= count
+
+    def _push(self, board: chess.Board, zobrist_hash: int, move: chess.Move) -> int:
+        piece_masks = self._get_piece_masks(board)
+        zobrist_hash ^= ZOBRIST_HASHER.hash_castling(board) ^ ZOBRIST_HASHER.hash_ep_square(board)
+
+        board.push(move)
+
+        zobrist_hash ^= ZOBRIST_HASHER.hash_castling(board) ^ ZOBRIST_HASHER.hash_ep_square(board) ^ ZOBRIST_ARRAY[780]
+        for piece_index, (old_mask, new_mask) in enumerate(zip(piece_masks, self._get_piece_masks(board))):
+            for square in chess.scan_forward(old_mask ^ new_mask):
+                zobrist_hash ^= ZOBRIST_ARRAY[64 * piece_index + square]
+
+        return zobrist_hash
+
+    def _get_piece_masks(self, board: chess.Board) -> list[int]:
+        return [board.pieces_mask(piece_type, color)
+                for piece_type in chess.PIECE_TYPES
+                for color in (chess.BLACK, chess.WHITE)]
+
+    def _get_repetition_key(self, board: chess.Board, zobrist_hash: int) -> int:
+        if isinstance(board, CrazyhouseBoard):
+            return zobrist_hash ^ hash(tuple(board.pockets[color].count(piece_type)
+                                             for color in chess.COLORS
+                                             for piece_type in chess.PIECE_TYPES))
+
+        if isinstance(board, ThreeCheckBoard):
+            return zobrist_hash ^ hash(tuple(board.remaining_checks))
+
+        return zobrist_hash
@@ -0,0 +1,102 @@
+import asyncio
+import time
+from collections.abc import AsyncIterator
+from contextlib import asynccontextmanager
+
+from enums import Request_Type
+
+# [request type, requests per second, burst size]
+REQUEST_RATES = {
+    Request_Type.CHALLENGE: (1.0, 3),
+    Request_Type.CHAT: (1.0, 4),
+    Request_Type.STATUS: (0.5, 2),
+    Request_Type.ACCOUNT: (0.5, 2),
+    Request_Type.CLOUD: (2.0, 4)}
+COOLDOWN_SECONDS = 60.0
+CRITICAL_WAIT = 0.5
+
+
+class Token_Bucket:
+    def __init__(self, rate: float, capacity: int) -> None:
+        self.rate = rate
+        self.capacity = capacity
+        self.tokens = float(capacity)
+        self.last_refill = time.monotonic()
+
+    def get_wait_time(self) -> float:
+        self._refill()
+        return max(1.0 - self.tokens, 0.0) / self.rate
+
+    def take(self) -> float:
+        self._refill()
+        self.tokens -= 1.0
+        return max(-self.tokens, 0.0) / self.rate
+
+    def _refill(self) -> None:
+        now = time.monotonic()
+        self.tokens = min(self.capacity, self.tokens + (now - self.last_refill) * self.rate)
+        self.last_refill = now
+
+
+class Rate_Limiter:
+    def __init__(self) -> None:
+        self.buckets = {request_type: Token_Bucket(rate, capacity)
+                        for request_type, (rate, capacity) in REQUEST_RATES.items()}
+        self.cooldown_until = 0.0
+        self.endpoint_cooldowns: dict[Request_Type, float] = {}
+        self.critical_requests = 0
+        self.critical_idle_event = asyncio.Event()
+        self.critical_idle_event.set()
+
+    def get_cooldown(self, request_type: Request_Type) -> float:
+        cooldown_until = max(self.cooldown_until, self.endpoint_cooldowns.get(request_type, 0.0))
+        return max(cooldown_until - time.monotonic(), 0.0)
+
+    def start_cooldown(self, request_type: Request_Type | None = None) -> None:
+        if request_type:
+            if not self.get_cooldown(request_type):
+                print(f'Rate limited by Lichess, pausing {request_type} requests for {COOLDOWN_SECONDS:.0f} seconds.')
+
+            self.endpoint_cooldowns[request_type] = time.monotonic() + COOLDOWN_SECONDS
+            return
+
+        if self.cooldown_until <= time.monotonic():
+            print(f'Rate limited by Lichess, pausing non-critical requests for {COOLDOWN_SECONDS:.0f} seconds.')
+
+        self.cooldown_until = time.monotonic() + COOLDOWN_SECONDS
+
+    async def try_acquire(self, request_type: Request_Type, max_wait: float) -> bool:
+        if self.get_cooldown(request_type):
+            return False
+
+        bucket = self.buckets[request_type]
+        if bucket.get_wait_time() > max_wait:
+            return False
+
+        if (delay := bucket.take()) > 0.0:
+            await asyncio.sleep(delay)
+
+        return True
+
+    @asynccontextmanager
+    async def critical(self) -> AsyncIterator[None]:
+        self.critical_requests += 1
+        self.critical_idle_event.clear()
+        try:
+            yield
+        finally:
+            self.critical_requests -= 1
+            if not self.critical_requests:
+                self.critical_idle_event.set()
+
+    async def acquire(self, request_type: Request_Type) -> None:
+        if (delay := self.buckets[request_type].take()) > 0.0:
+            await asyncio.sleep(delay)
+
+        while delay := self.get_cooldown(request_type):
+            await asyncio.sleep(delay)
+
+        try:
+            await asyncio.wait_for(self.critical_idle_event.wait(), CRITICAL_WAIT)
+        except TimeoutError:
+            pass
@@ -0,0 +1,129 @@
+import math
+import sys
+
+import psutil
+
+from configs import Resources_Config
+from engine import Engine
+
+MIN_GAME_DURATION = 60.0
+HASH_TOLERANCE = 0.25
+
+
+class Resource_Budget:
+    def __init__(self, resources_config: Resources_Config) -> None:
+        self.enabled = resources_config.enabled
+        self.threads = resources_config.threads or max((psutil.cpu_count() or 1) - 1, 1)
+        self.hash = resources_config.hash or max(psutil.virtual_memory().available // 2 // 1024**2, 16)
+        self.cpu_affinity = resources_config.cpu_affinity
+        self.engine_cores: list[int] = []
+        self.game_durations: dict[Engine, float] = {}
+        self.hash_sizes: dict[Engine, int] = {}
+
+    def start(self) -> None:
+        if not self.enabled:
+            return
+
+        print(f'Engines share {self.threads} thread(s) and {self.hash} MB hash.')
+
+        if self.cpu_affinity:
+            self._reserve_bot_core()
+
+    def add_engine(self, engine: Engine, game_duration: float) -> None:
+        if not self.enabled:
+            return
+
+        self.game_durations[engine] = game_duration
+        self._rebalance()
+
+    def remove_engine(self, engine: Engine) -> None:
+        if engine not in self.game_durations:
+            return
+
+        del self.game_durations[engine]
+        del self.hash_sizes[engine]
+        self._rebalance()
+
+    def pin_to_engine_cores(self, engine: Engine) -> None:
+        if self.engine_cores:
+            engine.set_cpu_affinity(self.engine_cores)
+
+    def _rebalance(self) -> None:
+        weights = {engine: math.sqrt(max(game_duration, MIN_GAME_DURATION))
+                   for engine, game_duration in self.game_durations.items()}
+        threads = self._distribute(self.threads, weights,
+                                   {engine: engine.get_option_limit('Threads') for engine in weights})
+        hash_sizes = self._distribute(self.hash, weights,
+                                      {engine: engine.get_option_limit('Hash') for engine in weights})
+
+        # Changing Hash clears the transposition table mid-game, so small changes of the share are not applied.
+        # This can exceed the hash budget by up to the tolerance.
+        for engine in weights:
+            current_hash = self.hash_sizes.get(engine)
+            if current_hash is None or abs(hash_sizes[engine] - current_hash) > current_hash * HASH_TOLERANCE:
+                self.hash_sizes[engine] = hash_sizes[engine]
+
+            engine.set_resources(threads[engine], self.hash_sizes[engine])
+
+        if self.engine_cores:
+            self._set_affinities(threads)
+
+    def _reserve_bot_core(self) -> None:
+        if not hasattr(psutil.Process, 'cpu_affinity'):
+            print('CPU affinity is not supported on this platform.')
+            return
+
+        try:
+            process = psutil.Process()
+            cores = sorted(process.cpu_affinity())
+            if len(cores) < 2:
+                print('CPU affinity needs at least two cores and is disabled.')
+                return
+
+            process.cpu_affinity(cores[:1])
+
+            if sys.platform == 'linux':
+                for thread in process.threads():
+                    psutil.Process(thread.id).cpu_affinity(cores[:1])
+        except psutil.Error as e:
+            print(f'CPU affinity of the bot could not be set: {e}')
+            return
+
+        self.engine_cores = cores[1:]
+        print(f'Bot pinned to core {cores[0]}, engines use cores {", ".join(map(str, self.engine_cores))}.')
+
+    def _set_affinities(self, threads: dict[Engine, int]) -> None:
+        offset = 0
+        for engine, thread_count in threads.items():
+            core_count = min(thread_count, len(self.engine_cores))
+            engine.set_cpu_affinity([self.engine_cores[(offset + index) % len(self.engine_cores)]
+                                     for index in range(core_count)])
+            offset += core_count
+
+    @staticmethod
+    def _distribute(total: int, weights: dict[Engine, float], limits: dict[Engine, int]) -> dict[Engine, int]:
+        allocation = dict.fromkeys(weights, 1)
+        remaining = total - len(weights)
+
+        while remaining > 0:
+            candidates = [engine for engine in weights if allocation[engine] < limits[engine]]
+            if not candidates:
+                break
+
+            weight_sum = sum(weights[engine] for engine in candidates)
+            shares = {engine: remaining * weights[engine] / weight_sum for engine in candidates}
+
+            granted = 0
+            for engine in candidates:
+                grant = min(int(shares[engine]), limits[engine] - allocation[engine])
+                allocation[engine] += grant
+                granted += grant
+
+            if not granted:
+                for engine in sorted(candidates, key=shares.__getitem__, reverse=True)[:remaining]:
+                    allocation[engine] += 1
+                break
+
+            remaining -= granted
+
+        return allocation
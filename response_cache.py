@@ -0,0 +1,86 @@
+import json
+import sqlite3
+import time
+from typing import Any
+
+from configs import Online_Cache_Config
+
+# [source, TTL of found positions, TTL of positions not found] in seconds
+SOURCE_TTLS = {
+    'chessdb': (86_400.0, 21_600.0),
+    'cloud': (604_800.0, 86_400.0),
+    'egtb': (2_592_000.0, 2_592_000.0),
+    'explorer': (21_600.0, 21_600.0)}
+
+
+class Response_Cache:
+    def __init__(self, cache_config: Online_Cache_Config) -> None:
+        self.max_entries = cache_config.max_entries
+        self.connection = self._open(cache_config.path) if cache_config.enabled else None
+        self.inserts_since_eviction = 0
+        self.pending_uses: dict[tuple[str, str], float] = {}
+
+    def get(self, source: str, key: str) -> dict[str, Any] | None:
+        if not self.connection:
+            return
+
+        row = self.connection.execute('SELECT response, expires FROM responses WHERE source = ? AND key = ?',
+                                      (source, key)).fetchone()
+        if not row:
+            return
+
+        now = time.time()
+        if row[1] < now:
+            return
+
+        self.pending_uses[(source, key)] = now
+        return json.loads(row[0])
+
+    def set(self, source: str, key: str, response: dict[str, Any], found: bool) -> None:
+        if not self.connection:
+            return
+
+        now = time.time()
+        ttl = SOURCE_TTLS[source][0 if found else 1]
+        self.connection.execute('INSERT OR REPLACE INTO responses VALUES (?, ?, ?, ?, ?)',
+                                (source, key, json.dumps(response), now + ttl, now))
+
+        self.inserts_since_eviction += 1
+        if self.inserts_since_eviction >= 100:
+            self._evict()
+
+    def close(self) -> None:
+        if not self.connection:
+            return
+
+        self._evict()
+        self.connection.close()
+        self.connection = None
+
+    def _open(self, path: str) -> sqlite3.Connection | None:
+        try:
+            connection = sqlite3.connect(path, isolation_level=None)
+            connection.execute('PRAGMA journal_mode = WAL')
+            connection.execute('PRAGMA synchronous = NORMAL')
+            connection.execute('CREATE TABLE IF NOT EXISTS responses (source TEXT, key TEXT, response TEXT, '
+                               'expires REAL, last_used REAL, PRIMARY KEY (source, key))')
+            connection.execute('CREATE INDEX IF NOT EXISTS last_used_index ON responses (last_used)')
+            connection.execute('DELETE FROM responses WHERE expires < ?', (time.time(),))
+        except sqlite3.Error as e:
+            print(f'Online moves cache "{path}" could not be opened: {e}')
+            return
+
+        return connection
+
+    def _evict(self) -> None:
+        assert self.connection
+
+        self.inserts_since_eviction = 0
+        pending_uses, self.pending_uses = self.pending_uses, {}
+        self.connection.execute('BEGIN')
+        self.connection.executemany('UPDATE responses SET last_used = ? WHERE source = ? AND key = ?',
+                                    [(last_used, source, key) for (source, key), last_used in pending_uses.items()])
+        self.connection.execute('DELETE FROM responses WHERE expires < ?', (time.time(),))
+        self.connection.execute(('DELETE FROM responses WHERE rowid NOT IN '
+                                 '(SELECT rowid FROM responses ORDER BY last_used DESC LIMIT ?)'), (self.max_entries,))
+        self.connection.execute('COMMIT')
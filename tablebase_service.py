@@ -0,0 +1,196 @@
+import asyncio
+import os
+from collections.abc import Callable
+from concurrent.futures import Executor, ThreadPoolExecutor
+from typing import TypeVar
+
+import chess
+import chess.gaviota
+import chess.syzygy
+from chess.variant import AntichessBoard, AtomicBoard
+
+from config import Config
+
+SYZYGY_BOARDS: dict[str, type[chess.Board]] = {'standard': chess.Board,
+                                               'antichess': AntichessBoard,
+                                               'atomic': AtomicBoard}
+
+ResultT = TypeVar('ResultT')
+
+
+class Tablebase_Service:
+    def __init__(self, config: Config) -> None:
+        self.config = config
+        self.syzygy_keys: dict[str, set[str]] = {}
+        self.syzygy_tablebases: dict[str, chess.syzygy.Tablebase] = {}
+        self.gaviota_keys: set[str] = set()
+        self.gaviota_tablebase: chess.gaviota.PythonTablebase | chess.gaviota.NativeTablebase | None = None
+        self.syzygy_executor = ThreadPoolExecutor(max(config.challenge.concurrency, 1), 'syzygy')
+        self.gaviota_executor = ThreadPoolExecutor(1, 'gaviota')
+
+    def start(self) -> None:
+        for variant, syzygy_config in self.config.syzygy.items():
+            if not (syzygy_config.enabled and syzygy_config.instant_play) or variant not in SYZYGY_BOARDS:
+                continue
+
+            table_names = self._index_syzygy(syzygy_config.paths, SYZYGY_BOARDS[variant])
+            self.syzygy_keys[variant] = self._get_keys(table_names, SYZYGY_BOARDS[variant].one_king)
+            print(f'{len(table_names)} {variant} syzygy table(s) available for probing.')
+
+        if self.config.gaviota.enabled:
+            table_names = self._index_gaviota(self.config.gaviota.paths)
+            self.gaviota_keys = self._get_keys(table_names, True)
+            print(f'{len(table_names)} gaviota table(s) available for probing.')
+
+    async def run_syzygy_probe(self,
+                               probe: Callable[[chess.Board, list[chess.Move]], ResultT],
+                               board: chess.Board,
+                               moves: list[chess.Move]) -> ResultT | None:
+        variant = 'standard' if board.uci_variant == 'chess' else board.uci_variant
+        if variant not in self.syzygy_keys:
+            return
+
+        self._get_syzygy_tablebase(variant)
+        return await self._run_probe(self.syzygy_executor, self.config.syzygy[variant].timeout, probe, board, moves)
+
+    async def run_gaviota_probe(self,
+                                probe: Callable[[chess.Board, list[chess.Move]], ResultT],
+                                board: chess.Board,
+                                moves: list[chess.Move]) -> ResultT | None:
+        if not self.gaviota_keys:
+            return
+
+        self._get_gaviota_tablebase()
+        return await self._run_probe(self.gaviota_executor, self.config.gaviota.timeout, probe, board, moves)
+
+    def probe_syzygy_dtz(self, board: chess.Board) -> int | None:
+        variant = 'standard' if board.uci_variant == 'chess' else board.uci_variant
+        if variant not in self.syzygy_keys:
+            return
+
+        if board.castling_rights or chess.syzygy.calc_key(board) not in self.syzygy_keys[variant]:
+            return
+
+        try:
+            return self._get_syzygy_tablebase(variant).probe_dtz(board)
+        except KeyError:
+            return
+
+    def probe_syzygy_wdl(self, board: chess.Board) -> int | None:
+        variant = 'standard' if board.uci_variant == 'chess' else board.uci_variant
+        if variant not in self.syzygy_keys:
+            return
+
+        if board.castling_rights or chess.syzygy.calc_key(board) not in self.syzygy_keys[variant]:
+            return
+
+        try:
+            return self._get_syzygy_tablebase(variant).probe_wdl(board)
+        except KeyError:
+            return
+
+    def probe_gaviota_dtm(self, board: chess.Board) -> int | None:
+        if board.castling_rights or chess.syzygy.calc_key(board) not in self.gaviota_keys:
+            return
+
+        try:
+            return self._get_gaviota_tablebase().probe_dtm(board)
+        except KeyError:
+            return
+
+    def close(self) -> None:
+        self.syzygy_executor.shutdown(wait=False, cancel_futures=True)
+        self.gaviota_executor.shutdown(wait=False, cancel_futures=True)
+
+        for tablebase in self.syzygy_tablebases.values():
+            tablebase.close()
+
+        self.syzygy_tablebases.clear()
+
+        if self.gaviota_tablebase:
+            self.gaviota_tablebase.close()
+            self.gaviota_tablebase = None
+
+    async def _run_probe(self,
+                         executor: Executor,
+                         timeout: float,
+                         probe: Callable[[chess.Board, list[chess.Move]], ResultT],
+                         board: chess.Board,
+                         moves: list[chess.Move]) -> ResultT | None:
+        try:
+            return await asyncio.wait_for(asyncio.get_running_loop().run_in_executor(executor, probe, board, moves),
+                                          timeout)
+        except TimeoutError:
+            print(f'Tablebase probe exceeded {timeout:.1f} seconds and was abandoned.')
+
+    def _get_syzygy_tablebase(self, variant: str) -> chess.syzygy.Tablebase:
+        if variant not in self.syzygy_tablebases:
+            paths = self.config.syzygy[variant].paths
+            tablebase = chess.syzygy.open_tablebase(paths[0], VariantBoard=SYZYGY_BOARDS[variant])
+
+            for path in paths[1:]:
+                tablebase.add_directory(path)
+
+            self.syzygy_tablebases[variant] = tablebase
+
+        return self.syzygy_tablebases[variant]
+
+    def _get_gaviota_tablebase(self) -> chess.gaviota.PythonTablebase | chess.gaviota.NativeTablebase:
+        if not self.gaviota_tablebase:
+            tablebase = chess.gaviota.open_tablebase(self.config.gaviota.paths[0])
+
+            for path in self.config.gaviota.paths[1:]:
+                tablebase.add_directory(path)
+
+            self.gaviota_tablebase = tablebase
+
+        return self.gaviota_tablebase
+
+    def _index_syzygy(self, paths: list[str], VariantBoard: type[chess.Board]) -> set[str]:
+        wdl_names: set[str] = set()
+        dtz_names: set[str] = set()
+        for path in paths:
+            for filename in os.listdir(path):
+                name, extension = os.path.splitext(filename)
+                if not chess.syzygy.is_tablename(name, one_king=VariantBoard.one_king):
+                    continue
+
+                if extension == VariantBoard.tbw_suffix:
+                    wdl_names.add(name)
+                elif extension == VariantBoard.tbz_suffix:
+                    dtz_names.add(name)
+                elif 'P' not in name and extension == VariantBoard.pawnless_tbw_suffix:
+                    wdl_names.add(name)
+                elif 'P' not in name and extension == VariantBoard.pawnless_tbz_suffix:
+                    dtz_names.add(name)
+
+        complete_names: set[str] = set()
+        for name in sorted(wdl_names, key=lambda name: (len(name), name.count('P'))):
+            if all(dependency in complete_names
+                   for dependency in chess.syzygy.dependencies(name, one_king=VariantBoard.one_king)):
+                complete_names.add(name)
+
+        return complete_names & dtz_names
+
+    def _index_gaviota(self, paths: list[str]) -> set[str]:
+        table_names: set[str] = set()
+        for path in paths:
+            for filename in os.listdir(path):
+                if not filename.endswith('.gtb.cp4'):
+                    continue
+
+                name = filename.removesuffix('.gtb.cp4').upper()
+                black_king_index = name.find('K', 1)
+                if name.startswith('K') and black_king_index > 0:
+                    table_names.add(f'{name[:black_king_index]}v{name[black_king_index:]}')
+
+        return table_names
+
+    def _get_keys(self, table_names: set[str], one_king: bool) -> set[str]:
+        keys = {'KvK'} if one_king else set()
+        for name in table_names:
+            white, black = name.split('v', 1)
+            keys.add(name)
+            keys.add(f'{black}v{white}')
+
+        return keys
@@ -25,6 +25,7 @@ COMMANDS = {
     'blacklist': 'Temporarily blacklists a user. Use config for permanent blacklisting. Usage: blacklist USERNAME',
     'challenge': 'Challenges a player. Usage: challenge USERNAME [TIMECONTROL] [COLOR] [RATED] [VARIANT]',
     'clear': 'Clears the challenge queue.',
+    'connections': 'Prints connection pool statistics.',
     'create': 'Challenges a player to COUNT game pairs. Usage: create COUNT USERNAME [TIMECONTROL] [RATED] [VARIANT]',
     'help': 'Prints this message.',
     'join': 'Joins a team. Usage: join TEAM [PASSWORD]',
@@ -95,6 +96,8 @@ class User_Interface:
                         self._challenge(command)
                     case 'clear':
                         self._clear()
+                    case 'connections':
+                        self._connections()
                     case 'create':
                         self._create(command)
                     case 'join':
@@ -190,6 +193,12 @@ class User_Interface:
         self.game_manager.challenge_requests.clear()
         print('Challenge queue cleared.')
 
+    def _connections(self) -> None:
+        for pool_name, pool_stats in self.api.pool_stats.items():
+            limit = pool_stats.limit or 'unlimited'
+            print(f'{pool_name:10} Limit: {limit:>9}     In flight: {pool_stats.in_flight:3}     '
+                  f'Peak: {pool_stats.peak_in_flight:3}     Requests: {pool_stats.requests:7}')
+
     def _create(self, command: list[str]) -> None:
         if len(command) < 3 or len(command) > 6:
             print(COMMANDS['create'])